@@ -0,0 +1,270 @@
+"""
+Re-classify stored events after CATEGORIES / THREAT_TYPES / SEVERITY_KEYWORDS change.
+
+Documents stream out of Elasticsearch (point-in-time + search_after) or the
+MongoDB server_logs collection, are classified across a process pool and only
+documents whose classification changed are written back with bulk updates.
+Progress is checkpointed after every written batch so an interrupted run can
+pick up where it stopped.
+
+    python backfill.py es --dry-run
+    python backfill.py mongo --workers 8 --resume
+"""
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import json
+import os
+import time
+
+from classifier import SEVERITY_RANK, classify_event, escalate
+from threat_intel import get_intel
+from timeseries import mark_stale
+
+FIELDS = ("category", "productivity", "threat_type", "severity")
+# read alongside FIELDS: url feeds indicator extraction, intel_hits is rewritten with severity
+EXTRA_FIELDS = ("url", "intel_hits")
+CHECKPOINT_DIR = Path(__file__).parent / "siem-log-server" / "logs"
+
+MONGO_URI = os.getenv("MONGODB_URI")
+MONGO_DB = "logs_database"
+MONGO_COLLECTION = "server_logs"
+
+
+# ---------------- Worker ----------------
+def reclassify_batch(batch, fields=FIELDS):
+    """
+    Classify (doc_id, message, level, current) tuples.
+    Returns a list of (doc_id, new_values, old_values) for changed documents only.
+    """
+    changes = []
+    intel = get_intel()
+    for doc_id, message, level, current in batch:
+        fresh, _ = classify_event(message or "", level or "INFO", current.get("url"), intel)
+        if intel is None and current.get("intel_hits") and current.get("severity") in SEVERITY_RANK:
+            # no snapshot on this host: keep the escalation recorded at ingest
+            fresh["severity"] = escalate(fresh["severity"], current["severity"])
+            fresh["intel_hits"] = current["intel_hits"]
+        changed = {k: fresh[k] for k in fields if current.get(k) != fresh[k]}
+        if "severity" in fields and fresh.get("intel_hits") != current.get("intel_hits"):
+            changed["intel_hits"] = fresh.get("intel_hits")
+        if changed:
+            changes.append((doc_id, changed, {k: current.get(k) for k in changed}))
+    return changes
+
+
+# ---------------- Stores ----------------
+class ElasticsearchStore:
+    name = "es"
+
+    def __init__(self, page_size=2000, keep_alive="5m"):
+        from elasticsearch import helpers
+        from es_client import get_es, INDEX_NAME
+        self.es = get_es()
+        self.index = INDEX_NAME
+        self.helpers = helpers
+        self.page_size = page_size
+        self.keep_alive = keep_alive
+
+    def iter_batches(self, position=None):
+        """Yield (batch, position) pages sorted by time; position is the last hit's sort values."""
+        pit = self.es.open_point_in_time(index=self.index, keep_alive=self.keep_alive)["id"]
+        query = {"match_all": {}}
+        search_after = position
+        try:
+            while True:
+                kwargs = {"search_after": search_after} if search_after else {}
+                res = self.es.search(
+                    pit={"id": pit, "keep_alive": self.keep_alive},
+                    query=query,
+                    sort=[{"time": "asc"}, {"_shard_doc": "asc"}],
+                    size=self.page_size,
+                    source=["log", "level", *FIELDS, *EXTRA_FIELDS],
+                    **kwargs
+                )
+                pit = res.get("pit_id", pit)
+                hits = res["hits"]["hits"]
+                if not hits:
+                    return
+                batch = [
+                    (h["_index"] + "/" + h["_id"], h["_source"].get("log"),
+                     h["_source"].get("level"), h["_source"])
+                    for h in hits
+                ]
+                search_after = hits[-1]["sort"]
+                yield batch, search_after
+        finally:
+            try:
+                self.es.close_point_in_time(id=pit)
+            except Exception:
+                pass
+
+    def write(self, changes):
+        """Apply updates; returns a list of (doc_id, reason) for documents that failed."""
+        actions = (
+            {"_op_type": "update", "_index": doc_id.split("/", 1)[0],
+             "_id": doc_id.split("/", 1)[1], "doc": new}
+            for doc_id, new, _ in changes
+        )
+        _, errors = self.helpers.bulk(self.es, actions, raise_on_error=False,
+                                      raise_on_exception=False)
+        failed = []
+        for item in errors:
+            info = next(iter(item.values()), {}) if isinstance(item, dict) else {}
+            failed.append((f"{info.get('_index')}/{info.get('_id')}",
+                           str(info.get("error", item))))
+        return failed
+
+
+class MongoStore:
+    name = "mongo"
+
+    def __init__(self, page_size=2000):
+        from pymongo import MongoClient, UpdateOne
+        from bson import ObjectId
+        self.collection = MongoClient(MONGO_URI)[MONGO_DB][MONGO_COLLECTION]
+        self.UpdateOne = UpdateOne
+        self.ObjectId = ObjectId
+        self.page_size = page_size
+
+    def iter_batches(self, position=None):
+        """Yield (batch, position) pages in _id order; position is the last _id as a string."""
+        query = {"_id": {"$gt": self.ObjectId(position)}} if position else {}
+        projection = {"log": 1, "level": 1, **{f: 1 for f in FIELDS + EXTRA_FIELDS}}
+        cursor = self.collection.find(query, projection).sort("_id", 1).batch_size(self.page_size)
+        batch = []
+        for doc in cursor:
+            batch.append((str(doc["_id"]), doc.get("log"), doc.get("level"), doc))
+            if len(batch) >= self.page_size:
+                yield batch, batch[-1][0]
+                batch = []
+        if batch:
+            yield batch, batch[-1][0]
+
+    def write(self, changes):
+        """Apply updates; returns a list of (doc_id, reason) for documents that failed."""
+        from pymongo.errors import BulkWriteError
+        ops = [self.UpdateOne({"_id": self.ObjectId(doc_id)}, {"$set": new})
+               for doc_id, new, _ in changes]
+        if not ops:
+            return []
+        try:
+            self.collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            return [(changes[err["index"]][0], err.get("errmsg", ""))
+                    for err in e.details.get("writeErrors", [])]
+        return []
+
+
+def strip_batch(batch):
+    # only the stored classification needs to travel to the worker processes
+    return [(i, m, l, {k: cur.get(k) for k in FIELDS + EXTRA_FIELDS}) for i, m, l, cur in batch]
+
+
+# ---------------- Checkpointing ----------------
+def checkpoint_path(store_name):
+    return CHECKPOINT_DIR / f"backfill_{store_name}.checkpoint.json"
+
+
+def load_checkpoint(store_name):
+    path = checkpoint_path(store_name)
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(store_name, state):
+    path = checkpoint_path(store_name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+# ---------------- Driver ----------------
+def run(store, workers=None, dry_run=False, resume=False, fields=FIELDS):
+    """Stream, classify and write back; returns a summary dict."""
+    state = load_checkpoint(store.name) if resume else {}
+    scanned = state.get("scanned", 0)
+    updated = state.get("updated", 0)
+    failed = []
+    field_counts = Counter()
+    transitions = Counter()
+    started = time.time()
+
+    workers = workers or os.cpu_count() or 1
+    window = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+
+        def drain_one():
+            nonlocal scanned, updated
+            future, size, position = pending.pop(0)
+            changes = future.result()
+            scanned += size
+            for _, new, old in changes:
+                for k, v in new.items():
+                    field_counts[k] += 1
+                    transitions[f"{k}: {old.get(k)} -> {v}"] += 1
+            if not dry_run:
+                errors = store.write(changes)
+                updated += len(changes) - len(errors)
+                failed.extend(errors)
+                # once a batch has failures the checkpoint stays before it, so
+                # --resume retries those documents (re-writing the rest is harmless)
+                if not failed:
+                    save_checkpoint(store.name, {"position": position,
+                                                 "scanned": scanned, "updated": updated})
+            else:
+                updated += len(changes)
+            rate = scanned / max(time.time() - started, 1e-9)
+            print(f"\rscanned {scanned}  changed {updated}  failed {len(failed)}  "
+                  f"({rate:,.0f} docs/s)", end="", flush=True)
+
+        # bounded window of in-flight batches; results drain in order so the
+        # checkpoint never moves past a batch that has not been written yet
+        for batch, position in store.iter_batches(state.get("position")):
+            pending.append((pool.submit(reclassify_batch, strip_batch(batch), fields),
+                            len(batch), position))
+            if len(pending) >= window:
+                drain_one()
+        while pending:
+            drain_one()
+    print()
+    if not dry_run and updated:
+        mark_stale()  # rewritten severities change already-cached timeseries buckets
+
+    return {
+        "scanned": scanned,
+        "changed": updated,
+        "failed": len(failed),
+        "failed_sample": failed[:20],
+        "by_field": dict(field_counts),
+        "top_transitions": transitions.most_common(20),
+        "dry_run": dry_run,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-classify stored events")
+    parser.add_argument("store", choices=["es", "mongo"])
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--page-size", type=int, default=2000)
+    parser.add_argument("--dry-run", action="store_true", help="report diffs without writing")
+    parser.add_argument("--resume", action="store_true", help="continue from the last checkpoint")
+    parser.add_argument("--fields", default=",".join(FIELDS),
+                        help="comma-separated subset of " + ", ".join(FIELDS))
+    args = parser.parse_args(argv)
+
+    fields = tuple(f for f in args.fields.split(",") if f in FIELDS)
+    store = ElasticsearchStore(args.page_size) if args.store == "es" else MongoStore(args.page_size)
+    summary = run(store, workers=args.workers, dry_run=args.dry_run,
+                  resume=args.resume, fields=fields)
+    print(json.dumps(summary, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare the JSON and binary (wire_format) ingest encodings.
+
+Reports bytes on the wire per event and server-side decode CPU per event for
+events shaped like the local agents send them. JSON is measured the way /log
+receives it today: one body per event.
+
+    python bench_wire_format.py --events 20000 --batch 100
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import random
+import time
+
+import wire_format
+
+
+def sample_events(n, seed=7):
+    rng = random.Random(seed)
+    start = datetime(2025, 9, 9, 12, 0, 0)
+    templates = [
+        lambda: {"log": rng.choice(["Suspicious PowerShell command executed",
+                                    "Outbound connection to known C2 server"]),
+                 "level": "WARNING", "ip": "127.0.0.1",
+                 "user_agent": "python-requests/2.32.3", "source": "malware_agent"},
+        lambda: {"log": f"chrome.exe connected to 142.250.{rng.randint(0, 255)}.{rng.randint(0, 255)}:443",
+                 "level": "INFO", "ip": "192.168.1.20",
+                 "user_agent": "network-agent/1.0", "source": "network_agent"},
+        lambda: {"log": f"MODIFIED event on C:\\Users\\demo\\Documents\\report_{rng.randint(1, 99)}.docx",
+                 "level": "INFO", "source": "file_access_agent"},
+    ]
+    events = []
+    for i in range(n):
+        event = rng.choice(templates)()
+        event["time"] = (start + timedelta(milliseconds=i * 137)).strftime("%Y-%m-%d %H:%M:%S,%f")[:-3]
+        events.append(event)
+    return events
+
+
+def cpu_per_event(fn, bodies, events):
+    started = time.process_time()
+    for body in bodies:
+        fn(body)
+    return (time.process_time() - started) / events * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JSON vs binary wire format")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100, help="events per binary body")
+    args = parser.parse_args(argv)
+
+    if not wire_format.available():
+        raise SystemExit("msgpack is not installed; pip install msgpack")
+
+    events = sample_events(args.events)
+    json_bodies = [json.dumps(e).encode("utf-8") for e in events]
+    bin_bodies = [wire_format.encode(events[i:i + args.batch])
+                  for i in range(0, len(events), args.batch)]
+    assert sum(len(wire_format.decode(b)) for b in bin_bodies) == len(events)
+
+    json_bytes = sum(map(len, json_bodies)) / len(events)
+    bin_bytes = sum(map(len, bin_bodies)) / len(events)
+    json_cpu = cpu_per_event(json.loads, json_bodies, len(events))
+    bin_cpu = cpu_per_event(wire_format.decode, bin_bodies, len(events))
+
+    print(f"{'format':<10}{'bytes/event':>14}{'decode µs/event':>18}")
+    print(f"{'json':<10}{json_bytes:>14.1f}{json_cpu:>18.2f}")
+    print(f"{'msgpack':<10}{bin_bytes:>14.1f}{bin_cpu:>18.2f}")
+    print(f"binary is {bin_bytes / json_bytes:.0%} of JSON size, "
+          f"{bin_cpu / json_cpu:.0%} of JSON decode CPU (batch={args.batch})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cold-import budget for server.py.
+
+Runs `python -X importtime -c "import server"` in fresh interpreters, prints the
+slowest imports and exits non-zero when a module that must stay lazy
+(Elasticsearch, matplotlib) gets pulled in at import time or when the import
+costs too much.
+
+The budget is relative: each run also imports a reference module (flask, which
+server.py cannot avoid) and the median difference must stay under --budget, so
+the check means the same on a slow CI runner and a fast laptop. A CI job that
+knows its hardware can add an absolute cap with --absolute-budget:
+
+    python check_import_time.py --budget 0.08 --runs 5
+    python check_import_time.py --absolute-budget 0.5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# server.py adds ~20-30ms over a bare `import flask`; headroom for noise, not for a new heavy import
+DEFAULT_BUDGET_SECONDS = 0.08
+DEFAULT_REFERENCE = "flask"
+LAZY_MODULES = ("elasticsearch", "matplotlib", "pymongo")
+
+
+def measure_import(module, root):
+    """Return (cumulative seconds per top-level import, set of imported package names)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=root, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    cumulative = {}
+    imported = set()
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if not parts[1].strip().isdigit():
+            continue
+        name = parts[2][1:]  # drop the separator space, keep nesting indent
+        imported.add(name.strip().split(".")[0])
+        if not name.startswith(" "):
+            # only top-level imports so nested modules are not double counted
+            cumulative[name] = int(parts[1]) / 1e6
+    return cumulative, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--reference", default=DEFAULT_REFERENCE,
+                        help="module whose import time is subtracted (empty to disable)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="maximum median import time over the reference, in seconds")
+    parser.add_argument("--absolute-budget", type=float, default=None,
+                        help="optional maximum median cold import time, in seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    root = Path(__file__).parent
+    totals, reference_totals = [], []
+    breakdown = {}
+    imported = set()
+    for _ in range(args.runs):
+        # interleaved so both sides see the same machine load
+        if args.reference:
+            reference, _ = measure_import(args.reference, root)
+            reference_totals.append(sum(reference.values()))
+        cumulative, imported = measure_import(args.module, root)
+        totals.append(sum(cumulative.values()))
+        for name, secs in cumulative.items():
+            breakdown.setdefault(name, []).append(secs)
+
+    median = statistics.median(totals)
+    reference_median = statistics.median(reference_totals) if reference_totals else 0.0
+    overhead = median - reference_median
+    print(f"import {args.module}: median {median * 1000:.1f} ms over {args.runs} runs")
+    if args.reference:
+        print(f"import {args.reference}: median {reference_median * 1000:.1f} ms "
+              f"-> {args.module} adds {overhead * 1000:.1f} ms (budget {args.budget * 1000:.0f} ms)")
+    slowest = sorted(breakdown.items(), key=lambda kv: statistics.median(kv[1]), reverse=True)
+    for name, samples in slowest[:args.top]:
+        print(f"  {statistics.median(samples) * 1000:8.1f} ms  {name}")
+
+    failed = False
+    eager = [m for m in LAZY_MODULES if m in imported]
+    if eager:
+        print(f"❌ imported eagerly: {', '.join(eager)}")
+        failed = True
+    if overhead > args.budget:
+        print(f"❌ cold import exceeds budget over {args.reference or 'nothing'}")
+        failed = True
+    if args.absolute_budget is not None and median > args.absolute_budget:
+        print(f"❌ cold import exceeds absolute budget ({args.absolute_budget * 1000:.0f} ms)")
+        failed = True
+    if not failed:
+        print("✅ within budget")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,28 @@
-from flask import Flask, request, jsonify
-from datetime import datetime, timedelta
+from flask import Flask, Blueprint, request, jsonify
+from datetime import datetime, timedelta, timezone
 from collections import defaultdict
+from pathlib import Path
 from urllib.parse import urlparse
-import os
 import re
 
+from classifier import DomainSuffixIndex
+from es_client import get_es, SESSIONS_INDEX
+from log_maintenance import compact
+from sessions import clear_sessions, focus_query, focus_times, sessionizer
 
 
-LOG_FILE_PATH = os.path.join("siem-log-server", "logs", "server.log")
+LOG_FILE_PATH = Path(__file__).parent / "siem-log-server" / "logs" / "server.log"
 PRODUCTIVE_DOMAINS = ["mail.google.com", "docs.google.com", "calendar.google.com"]
 ENTERTAINMENT_DOMAINS = ["youtube.com", "netflix.com", "reddit.com"]
 
+# suffix indexes so subdomains (e.g. "m.youtube.com") count toward their parent
+DOMAIN_GROUPS = {
+    "productive": DomainSuffixIndex({d: True for d in PRODUCTIVE_DOMAINS}),
+    "entertainment": DomainSuffixIndex({d: True for d in ENTERTAINMENT_DOMAINS}),
+}
+
+chrome_logs = Blueprint("chrome_logs", __name__)
+
 def parse_focus_logs(hours):
     cutoff = datetime.utcnow() - timedelta(hours=hours)
     domain_times = defaultdict(float)
@@ -57,17 +69,33 @@ def parse_focus_logs(hours):
     return domain_times
 
 
+def session_focus_times(hours):
+    """
+    Dwell seconds per domain from the sessions built at ingest time, plus
+    sessions that are still open. Falls back to scanning server.log when
+    Elasticsearch is unavailable.
+    """
+    try:
+        res = get_es().search(index=SESSIONS_INDEX, body=focus_query(hours))
+    except Exception:
+        return parse_focus_logs(hours)
+
+    domain_times = defaultdict(float, focus_times(res))
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    for domain, seconds in sessionizer.open_durations(since).items():
+        domain_times[domain] += seconds
+    return domain_times
+
+
 def summarize_domains(domain_times, category):
-    def summarize(domains):
+    def summarize(index):
         return sorted(
-            [(d, round(t / 60, 1)) for d, t in domain_times.items() if d in domains],
+            [(d, round(t / 60, 1)) for d, t in domain_times.items() if d in index],
             key=lambda x: x[1], reverse=True
         )
 
-    if category == "productive":
-        result = summarize(PRODUCTIVE_DOMAINS)
-    elif category == "entertainment":
-        result = summarize(ENTERTAINMENT_DOMAINS)
+    if category in DOMAIN_GROUPS:
+        result = summarize(DOMAIN_GROUPS[category])
     elif category == "all":
         result = sorted(
             [(d, round(t / 60, 1)) for d, t in domain_times.items()],
@@ -79,12 +107,12 @@ def summarize_domains(domain_times, category):
     return None, result
 
 
-@app.route("/chrome-logs/focus/get", methods=["GET"])
+@chrome_logs.route("/chrome-logs/focus/get", methods=["GET"])
 def get_focus_logs():
     hours = int(request.args.get("hours", 1))
     category = request.args.get("category", "all").strip().lower()
 
-    domain_times = parse_focus_logs(hours)
+    domain_times = session_focus_times(hours)
     error, result = summarize_domains(domain_times, category)
     if error:
         return jsonify(error), 400
@@ -97,7 +125,7 @@ def get_focus_logs():
     })
 
 
-@app.route("/chrome-logs/focus/update", methods=["POST"])
+@chrome_logs.route("/chrome-logs/focus/update", methods=["POST"])
 def update_focus_logs():
     data = request.get_json(silent=True)
     if not data or "hours" not in data:
@@ -106,7 +134,7 @@ def update_focus_logs():
     hours = int(data["hours"])
     category = data.get("category", "all").strip().lower()
 
-    domain_times = parse_focus_logs(hours)
+    domain_times = session_focus_times(hours)
     error, result = summarize_domains(domain_times, category)
     if error:
         return jsonify(error), 400
@@ -119,37 +147,35 @@ def update_focus_logs():
     })
 
 
-@app.route("/chrome-logs/focus/clear", methods=["DELETE"])
+@chrome_logs.route("/chrome-logs/focus/clear", methods=["DELETE"])
 def clear_focus_logs():
-    if not os.path.exists(LOG_FILE_PATH):
-        return jsonify({"status": "Log file already cleared"}), 200
-
-    with open(LOG_FILE_PATH, "r") as f:
-        lines = f.readlines()
-
-    with open(LOG_FILE_PATH, "w") as f:
-        inside_block = False
-        skip_block = False
-        for line in lines:
-            if line.strip() == "":
-                if not skip_block:
-                    f.write("\n")
-                inside_block = False
-                skip_block = False
-            elif ": " in line:
-                if not inside_block:
-                    inside_block = True
-                    skip_block = False
-                if "chrome" in line.lower() or "google.com" in line.lower():
-                    skip_block = True
-                if not skip_block:
-                    f.write(line)
-            else:
-                if not skip_block:
-                    f.write(line)
-
-    return jsonify({"status": "Chrome-related logs cleared"}), 200
+    """
+    Remove browser activity from server.log, the stored dwell sessions and
+    the sessions still open in memory, so /focus/get starts from zero.
+    """
+    # every session comes from a chrome-url-logger navigation, so all of them match
+    open_dropped = sessionizer.clear()
+    try:
+        sessions_removed = clear_sessions()
+    except Exception as e:
+        return jsonify({"error": f"Failed to clear stored sessions: {e}"}), 500
+
+    removed = 0
+    if LOG_FILE_PATH.exists():
+        def keep(record):
+            r = record.lower()
+            return "chrome" not in r and "google.com" not in r
 
+        kept, removed = compact(LOG_FILE_PATH, keep)
+
+    return jsonify({
+        "status": "Chrome-related logs cleared",
+        "removed": removed,
+        "sessions_removed": sessions_removed,
+        "open_sessions_dropped": open_dropped
+    }), 200
 
 if __name__ == "__main__":
+    app = Flask(__name__)
+    app.register_blueprint(chrome_logs)
     app.run(debug=True, port=5001)
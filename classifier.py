@@ -0,0 +1,334 @@
+from functools import lru_cache
+from pathlib import Path
+from urllib.parse import urlsplit
+import re
+
+# ---------------- Categories ----------------
+CATEGORIES = {
+    "Entertainment": ["netflix", "youtube", "spotify", "primevideo", "hulu"],
+    "Social Media": ["facebook", "twitter", "instagram", "tiktok", "snapchat"],
+    "News": ["cnn", "bbc", "nytimes", "reuters", "news"],
+    "Work": ["slack", "github", "gitlab", "zoom", "microsoft teams", "jira", "confluence"],
+    "Education": ["khanacademy", "coursera", "edx", "udemy", "academia", "tryhackme"],
+    "Shopping": ["amazon", "ebay", "flipkart", "etsy", "walmart"],
+    "Gaming": ["twitch", "steam", "epicgames", "roblox", "riotgames"],
+    "Finance": ["paypal", "bank", "finance", "trading", "investment"],
+    "Adult": ["porn", "xxx", "sex", "adult", "nsfw"],
+    "Other": []
+}
+
+# Domain suffixes per category; a suffix also covers every subdomain below it
+# (e.g. "github.com" matches "gist.github.com").
+CATEGORY_DOMAINS = {
+    "Entertainment": ["netflix.com", "youtube.com", "youtu.be", "spotify.com",
+                      "primevideo.com", "hulu.com", "reddit.com"],
+    "Social Media": ["facebook.com", "twitter.com", "x.com", "instagram.com",
+                     "tiktok.com", "snapchat.com", "linkedin.com"],
+    "News": ["cnn.com", "bbc.com", "bbc.co.uk", "nytimes.com", "reuters.com"],
+    "Work": ["slack.com", "github.com", "githubusercontent.com", "gitlab.com",
+             "zoom.us", "teams.microsoft.com", "atlassian.net",
+             "mail.google.com", "docs.google.com", "calendar.google.com"],
+    "Education": ["khanacademy.org", "coursera.org", "edx.org", "udemy.com",
+                  "academia.edu", "tryhackme.com"],
+    "Shopping": ["amazon.com", "amazon.in", "ebay.com", "flipkart.com",
+                 "etsy.com", "walmart.com"],
+    "Gaming": ["twitch.tv", "steampowered.com", "steamcommunity.com",
+               "epicgames.com", "roblox.com", "riotgames.com"],
+    "Finance": ["paypal.com"],
+    "Adult": [],
+    "Other": []
+}
+
+PRODUCTIVE_CATEGORIES = {"Work", "Education"}
+DISTRACTIVE_CATEGORIES = {"Entertainment", "Social Media", "Shopping", "Gaming", "Adult"}
+NEUTRAL_CATEGORIES = {"News", "Finance", "Other"}
+
+URL_PATTERN = re.compile(r"\b[a-z][a-z0-9+.\-]*://[^\s\"'<>]+", re.IGNORECASE)
+HOST_CACHE_SIZE = 4096
+
+
+# ---------------- Domain suffix index ----------------
+class DomainSuffixIndex:
+    """
+    Trie keyed on reversed host labels ("com" -> "github" -> "gist").
+    A lookup returns the value of the longest registered suffix of the host.
+    """
+    _VALUE = object()
+
+    def __init__(self, mapping=None):
+        self._root = {}
+        for suffix, value in (mapping or {}).items():
+            self.add(suffix, value)
+
+    def add(self, suffix: str, value) -> None:
+        node = self._root
+        for label in reversed(suffix.lower().strip(".").split(".")):
+            node = node.setdefault(label, {})
+        node[self._VALUE] = value
+
+    def lookup(self, host: str, default=None):
+        node = self._root
+        found = default
+        for label in reversed(host.lower().rstrip(".").split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            found = node.get(self._VALUE, found)
+        return found
+
+    def __contains__(self, host: str) -> bool:
+        return self.lookup(host, self._VALUE) is not self._VALUE
+
+
+def _build_domain_index():
+    index = DomainSuffixIndex()
+    for category, suffixes in CATEGORY_DOMAINS.items():
+        for suffix in suffixes:
+            index.add(suffix, category)
+    return index
+
+
+def _build_label_index():
+    # single-word keywords double as whole host labels, e.g. "www.netflix.net"
+    labels = {}
+    for category, keywords in CATEGORIES.items():
+        for k in keywords:
+            if " " not in k:
+                labels.setdefault(k, category)
+    return labels
+
+
+def _build_keyword_patterns():
+    # whole-word matching so "sex" does not fire on "essex" or "news" on "newsletter"
+    return [
+        (category, re.compile(r"\b(?:" + "|".join(re.escape(k) for k in keywords) + r")\b"))
+        for category, keywords in CATEGORIES.items() if keywords
+    ]
+
+
+DOMAIN_INDEX = _build_domain_index()
+LABEL_INDEX = _build_label_index()
+KEYWORD_PATTERNS = _build_keyword_patterns()
+
+
+# ---------------- Categorization ----------------
+def extract_host(message: str):
+    """Return the host of the first URL in the message, or None when there is no URL."""
+    match = URL_PATTERN.search(message)
+    if not match:
+        return None
+    try:
+        return urlsplit(match.group(0)).hostname or ""
+    except ValueError:
+        return ""
+
+
+@lru_cache(maxsize=HOST_CACHE_SIZE)
+def categorize_host(host: str) -> str:
+    category = DOMAIN_INDEX.lookup(host)
+    if category:
+        return category
+    for label in host.split("."):
+        if label in LABEL_INDEX:
+            return LABEL_INDEX[label]
+    return "Other"
+
+
+def categorize_keywords(message: str) -> str:
+    m = message.lower()
+    for category, pattern in KEYWORD_PATTERNS:
+        if pattern.search(m):
+            return category
+    return "Other"
+
+
+def categorize_log(message: str) -> str:
+    host = extract_host(message)
+    if host is not None:
+        return categorize_host(host)
+    return categorize_keywords(message)
+
+
+def classify_productivity(category: str) -> str:
+    if category in PRODUCTIVE_CATEGORIES:
+        return "Productive"
+    if category in DISTRACTIVE_CATEGORIES:
+        return "Distractive"
+    return "Neutral"
+
+
+# ---------------- Threat & Severity rules ----------------
+SEVERITY_ORDER = ["Low", "Medium", "High", "Critical"]
+SEVERITY_RANK = {s: i for i, s in enumerate(SEVERITY_ORDER)}
+
+SEVERITY_KEYWORDS = {
+    "Critical": [
+        "ransomware", "data exfiltration", "rootkit", "domain admin compromise",
+        "privilege escalation success", "encryption in progress",
+        "c2 communication", "command and control", "wiper", "supply chain compromise"
+    ],
+    "High": [
+        "malware detected", "trojan", "botnet", "keylogger", "backdoor",
+        "sql injection", "xss", "remote code execution", "rce", "lateral movement",
+        "brute force success", "multiple failed logins", "payload delivered",
+        "phishing credentials posted", "ddos", "dos attack", "exploitation"
+    ],
+    "Medium": [
+        "failed login", "suspicious", "anomalous", "port scan", "scan detected",
+        "phishing", "blocked", "policy violation", "vpn anomaly", "geo anomaly",
+        "file quarantine", "malicious url"
+    ],
+    "Low": [
+        "warning", "adware", "pua", "unwanted", "spam", "info", "debug",
+        "blocked by policy"
+    ]
+}
+
+THREAT_TYPES = {
+    "ransomware": ["ransomware", "encryption demanded", "files encrypted"],
+    "malware": ["malware", "virus", "payload", "infected", "quarantined"],
+    "trojan": ["trojan", "backdoor", "remote access trojan", "rat"],
+    "worm": ["worm", "self-replicating"],
+    "spyware": ["spyware", "keylogger", "credential theft"],
+    "adware": ["adware", "pua", "unwanted"],
+    "phishing": ["phishing", "credential harvest", "fake login", "spoofed"],
+    "brute-force": ["brute force", "multiple failed login", "password spray"],
+    "sql-injection": ["sql injection", "sqli"],
+    "xss": ["xss", "cross site scripting"],
+    "dos": ["ddos", "dos", "denial of service"],
+    "c2": ["c2", "command and control", "beacon"],
+}
+
+IOC_PATTERNS = [
+    r"(?:\d{1,3}\.){3}\d{1,3}",                  # IP addresses
+    r"[0-9a-f]{32,64}",                          # hashes md5/sha1/sha256 length-ish
+    r"(?:http|https)://[^\s]+",                  # urls
+    r"[a-z0-9\.\-]+\.[a-z]{2,}"                  # domains
+]
+
+# compiled once at import instead of on every request
+IOC_REGEX = re.compile("|".join(f"(?:{p})" for p in IOC_PATTERNS))
+
+
+def escalate(current: str, floor: str) -> str:
+    return current if SEVERITY_RANK[current] >= SEVERITY_RANK[floor] else floor
+
+
+def detect_threat_type(message: str) -> str:
+    m = message.lower()
+    for ttype, keys in THREAT_TYPES.items():
+        if any(k in m for k in keys):
+            return ttype
+    return "none"
+
+
+def score_severity(log_level: str, message: str, category: str) -> str:
+    """
+    Choose the highest matching severity by keyword; escalate
+    on signal like log level ERROR/CRITICAL and obvious IOC presence.
+    """
+    m = message.lower()
+    chosen = "Low"
+
+    # keyword-based
+    for level in SEVERITY_ORDER[::-1]:  # start from Critical downwards
+        if any(k in m for k in SEVERITY_KEYWORDS[level]):
+            chosen = level
+            break
+
+    # escalate if we see IOCs (IPs, URLs, hashes, domains)
+    if IOC_REGEX.search(m):
+        chosen = escalate(chosen, "Medium")
+
+    # log level based hints
+    lvl = (log_level or "").upper()
+    if lvl in ("CRITICAL", "FATAL"):
+        chosen = "Critical"
+    elif lvl == "ERROR":
+        chosen = escalate(chosen, "High")
+    elif lvl == "WARN":
+        chosen = escalate(chosen, "Medium")
+
+    # productivity context: distractive with policy violation can be Medium
+    if category in DISTRACTIVE_CATEGORIES and ("policy" in m or "blocked" in m):
+        chosen = escalate(chosen, "Medium")
+
+    return chosen
+
+
+def classify(message: str, log_level: str = "INFO") -> dict:
+    """Run the full classification pipeline and return the derived fields."""
+    category = categorize_log(message)
+    return {
+        "category": category,
+        "productivity": classify_productivity(category),
+        "threat_type": detect_threat_type(message),
+        "severity": score_severity(log_level, message, category),
+    }
+
+
+# ---------------- Indicator extraction ----------------
+IP_REGEX = re.compile(r"\b(?:25[0-5]|2[0-4]\d|1?\d?\d)(?:\.(?:25[0-5]|2[0-4]\d|1?\d?\d)){3}\b")
+HASH_REGEX = re.compile(r"\b(?:[0-9a-f]{64}|[0-9a-f]{40}|[0-9a-f]{32})\b", re.IGNORECASE)
+# bare domains ("connection to evil.example.com"); not part of a path, URL or longer token
+BARE_DOMAIN_REGEX = re.compile(
+    r"(?<![\w.\-\\/:])(?:[a-z0-9](?:[a-z0-9\-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}(?![\w\-])",
+    re.IGNORECASE
+)
+# a bare name only counts when its last label is a real TLD, so setting names
+# such as "System Access.MinimumPasswordLength" are not taken for domains
+TLD_FILE = Path(__file__).parent / "tlds.txt"
+# some TLDs are also file extensions ("setup.zip", "script.py"); those stay files
+FILE_EXTENSIONS = {
+    "exe", "dll", "sys", "bat", "cmd", "ps1", "vbs", "js", "py", "msi", "scr", "jar",
+    "doc", "docx", "xls", "xlsx", "xlsm", "ppt", "pptx", "pdf", "txt", "log", "csv", "json",
+    "xml", "ini", "inf", "tmp", "dat", "bin", "png", "jpg", "jpeg", "gif", "zip", "rar",
+    "gz", "7z", "iso", "html", "htm", "lnk",
+}
+
+
+@lru_cache(maxsize=None)
+def known_tlds() -> frozenset:
+    """Top-level domains from TLD_FILE, read on first use."""
+    with open(TLD_FILE, "r", encoding="ascii") as f:
+        return frozenset(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+
+def extract_iocs(message: str, url: str = None) -> dict:
+    """IPs, domains (URL hosts and bare names) and hashes in a message and its url field."""
+    domains = []
+    for text in (message, url or ""):
+        for match in URL_PATTERN.finditer(text):
+            try:
+                host = urlsplit(match.group(0)).hostname
+            except ValueError:
+                host = None
+            if host and not IP_REGEX.fullmatch(host) and host not in domains:
+                domains.append(host)
+    for match in BARE_DOMAIN_REGEX.finditer(URL_PATTERN.sub(" ", message)):
+        host = match.group(0).lower()
+        tld = host.rsplit(".", 1)[1]
+        if tld in known_tlds() and tld not in FILE_EXTENSIONS and host not in domains:
+            domains.append(host)
+    return {
+        "ips": list(dict.fromkeys(IP_REGEX.findall(message))),
+        "domains": domains,
+        "hashes": list(dict.fromkeys(h.lower() for h in HASH_REGEX.findall(message))),
+    }
+
+
+def classify_event(message: str, log_level: str = "INFO", url: str = None, intel=None):
+    """
+    classify() plus indicator extraction and threat-intel escalation.
+
+    Shared by ingest and the re-classification tools so a stored severity
+    always means the same thing. `intel` is a threat_intel.ThreatIntel (or
+    None when no snapshot is available). Returns (analysis, iocs).
+    """
+    analysis = classify(message, log_level)
+    iocs = extract_iocs(message, url)
+    hits = intel.match(iocs) if intel else {}
+    if hits:
+        analysis["severity"] = escalate(analysis["severity"], "Critical" if "hashes" in hits else "High")
+        analysis["intel_hits"] = hits
+    return analysis, iocs
@@ -0,0 +1,20 @@
+from functools import lru_cache
+import os
+
+# ---------------- Elasticsearch Setup ----------------
+ES_HOSTS = os.getenv("ES_HOSTS", "https://localhost:9200").split(",")
+ES_USER = os.getenv("ES_USER", "elastic")
+ES_PASSWORD = os.getenv("ES_PASSWORD", "a7AUn2fk5sluS3so8q8f")   # <-- your tested password
+INDEX_NAME = "siemtrix-logs"
+SESSIONS_INDEX = "siemtrix-sessions"
+
+
+@lru_cache(maxsize=None)
+def get_es():
+    """Build the Elasticsearch client on first use and reuse it afterwards."""
+    from elasticsearch import Elasticsearch
+    return Elasticsearch(
+        ES_HOSTS,                                       # HTTPS connection
+        basic_auth=(ES_USER, ES_PASSWORD),
+        verify_certs=False                              # OK for local dev/self-signed certs
+    )
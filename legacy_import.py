@@ -0,0 +1,208 @@
+"""
+Import the legacy siem-log-server/logs/server.log into Elasticsearch.
+
+The file mixes two formats:
+
+* write_pretty_log blocks ("key: value" lines, blank-line separated), and
+* app.logger records from server.py ("<asctime> - INFO - log: ..." followed
+  by the remaining "key: value" lines).
+
+Values may span several lines (and blank lines), e.g. the firewall dumps sent
+by policy_agent; any line that does not start with a known key continues the
+previous value. The file is cut into byte ranges aligned on record starts and
+each range is parsed, classified and bulk-indexed by a separate process, so
+memory stays bounded by the chunk and bulk batch sizes.
+
+    python legacy_import.py --dry-run
+    python legacy_import.py path/to/server.log --workers 8 --chunk-mb 32
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+import argparse
+import hashlib
+import os
+import time
+
+from classifier import classify_event
+from log_maintenance import (DEFAULT_LOG_PATH, LOGGER_RECORD_START, PRETTY_RECORD_START,
+                             TIME_FORMAT, split_records)
+from threat_intel import get_intel
+from timeseries import mark_stale
+
+KNOWN_KEYS = (
+    "level", "time", "log", "ip", "user_agent", "url", "source",
+    "category", "productivity", "threat_type", "severity", "category_type",
+)
+# keys re-derived from the message rather than trusted from the old file
+DERIVED_KEYS = {"category", "productivity", "threat_type", "severity", "category_type", "intel_hits"}
+BULK_SIZE = 1000
+
+
+# ---------------- Parsing ----------------
+def split_key(line):
+    key, sep, value = line.partition(":")
+    if sep and key in KNOWN_KEYS and (value == "" or value.startswith(" ")):
+        return key, value[1:] if value else ""
+    return None, None
+
+
+def is_record_start(line):
+    """Boundary used to align chunks: a logger line or a pretty block's first line."""
+    return bool(LOGGER_RECORD_START.match(line)) or line.startswith(PRETTY_RECORD_START)
+
+
+def parse_events(records):
+    """
+    Turn raw records into event dicts. Records that do not open with a known key
+    are continuations of the previous event (multi-line values split by blank lines).
+    Logger records that are not events ("✅ Log successfully sent ...") are skipped.
+    """
+    event = None
+    last_key = None
+    for record in records:
+        lines = record.splitlines()
+        first = lines[0] if lines else ""
+        match = LOGGER_RECORD_START.match(first)
+        key, _ = split_key(first)
+
+        if match or key:
+            if event:
+                yield {k: v.rstrip() for k, v in event.items()}
+            event, last_key = None, None
+            if match:
+                rest = first[match.end():]
+                if not rest.startswith("log: "):
+                    continue
+                event = {"time": match.group(1)}
+                lines[0] = rest
+            else:
+                event = {}
+        elif event is None:
+            continue  # continuation of an event that started in an earlier chunk
+
+        for line in lines:
+            key, value = split_key(line)
+            if key and key not in event:
+                event[key] = value
+                last_key = key
+            elif last_key:
+                event[last_key] += "\n" + line
+    if event:
+        yield {k: v.rstrip() for k, v in event.items()}
+
+
+def iter_range_lines(path, start, end):
+    """Yield decoded lines for the records that begin inside [start, end)."""
+    with open(path, "rb") as f:
+        at_line_start = True
+        if start:
+            f.seek(start - 1)
+            at_line_start = f.read(1) == b"\n"
+        f.seek(start)
+        pos = start
+        started = start == 0
+        for raw in f:
+            line = raw.decode("utf-8", errors="replace")
+            boundary = at_line_start and is_record_start(line)
+            if boundary and pos >= end:
+                return
+            if boundary:
+                started = True
+            if started:
+                yield line
+            at_line_start = True
+            pos += len(raw)
+
+
+def to_document(event):
+    message = event.get("log", "")
+    level = event.get("level") or "INFO"
+    try:
+        ts = datetime.strptime(event.get("time", ""), TIME_FORMAT).astimezone()
+    except ValueError:
+        ts = None
+    doc = {k: v for k, v in event.items() if k not in DERIVED_KEYS and k != "time"}
+    doc["level"] = level
+    doc["time"] = ts
+    doc.update(classify_event(message, level, event.get("url"), get_intel())[0])
+    # deterministic id so re-running the import does not duplicate events
+    doc_id = hashlib.sha1(
+        f"{event.get('time')}|{event.get('ip')}|{message}".encode("utf-8")
+    ).hexdigest()
+    return doc_id, doc
+
+
+# ---------------- Workers ----------------
+def import_range(path, start, end, dry_run=False):
+    """Parse, classify and index one chunk. Returns (bytes, events, errors)."""
+    es = helpers = index = None
+    if not dry_run:
+        from elasticsearch import helpers
+        from es_client import get_es, INDEX_NAME
+        es, index = get_es(), INDEX_NAME
+
+    events = errors = 0
+    actions = []
+
+    def flush():
+        nonlocal errors
+        if actions and not dry_run:
+            _, failed = helpers.bulk(es, actions, raise_on_error=False, stats_only=True)
+            errors += failed
+        actions.clear()
+
+    for event in parse_events(split_records(iter_range_lines(path, start, end))):
+        doc_id, doc = to_document(event)
+        actions.append({"_op_type": "index", "_index": index, "_id": doc_id, "_source": doc})
+        events += 1
+        if len(actions) >= BULK_SIZE:
+            flush()
+    flush()
+    return end - start, events, errors
+
+
+def chunk_ranges(path, chunk_bytes):
+    size = os.path.getsize(path)
+    return [(s, min(s + chunk_bytes, size)) for s in range(0, size, chunk_bytes)]
+
+
+def run(path, workers=None, chunk_bytes=32 * 1024 * 1024, dry_run=False):
+    path = str(path)
+    ranges = chunk_ranges(path, chunk_bytes)
+    total = os.path.getsize(path)
+    done = events = errors = 0
+    started = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(import_range, path, s, e, dry_run) for s, e in ranges]
+        for future in as_completed(futures):
+            n_bytes, n_events, n_errors = future.result()
+            done += n_bytes
+            events += n_events
+            errors += n_errors
+            elapsed = max(time.time() - started, 1e-9)
+            print(f"\r{done / max(total, 1):6.1%}  {events} events  {errors} errors  "
+                  f"({done / elapsed / 1e6:.1f} MB/s)", end="", flush=True)
+    print()
+    if not dry_run and events:
+        mark_stale()  # imported events land in already-cached timeseries buckets
+    return {"bytes": total, "events": events, "errors": errors, "dry_run": dry_run}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import legacy server.log into Elasticsearch")
+    parser.add_argument("path", nargs="?", default=str(DEFAULT_LOG_PATH))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-mb", type=float, default=32)
+    parser.add_argument("--dry-run", action="store_true", help="parse and classify only")
+    args = parser.parse_args(argv)
+
+    if not Path(args.path).exists():
+        parser.error(f"{args.path} not found")
+    summary = run(args.path, args.workers, int(args.chunk_mb * 1024 * 1024), args.dry_run)
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
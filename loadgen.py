@@ -0,0 +1,436 @@
+"""
+Synthetic load and journal replay against the /log ingest endpoint.
+
+`generate` builds a seeded stream from the agents' event shapes (malware,
+network, file access, policy, Windows event log, chrome tab) at a target
+events/second. Events arrive in bursts whose size is geometric with mean
+--burst (1 = plain Poisson arrivals); gaps between bursts are stretched so the
+mean rate stays at --rate. The same seed always yields the same events in the
+same order with the same spacing; only the absolute "time" values follow the
+wall clock.
+
+`replay` streams recorded events (agent journals through their segment
+index, single .gz/.zst segments or a `generate --out` file), optionally
+limited to a --since/--until window, with the original spacing divided by
+--speed (0 = as fast as the workers can send).
+
+Both report the achieved rate, the non-200/connection errors the server
+returned, request latency percentiles and how far sends lagged their
+schedule (a lagging generator means the server, not the target, set the pace).
+
+    python loadgen.py generate --rate 500 --duration 60 --mix network=5,chrome=3,malware=1 --burst 4
+    python loadgen.py generate --rate 200 --events 10000 --seed 3 --out stream.jsonl
+    python loadgen.py replay local-log-agent/logs/network_log.json --since "2025-07-04 20:00:00" --speed 10
+"""
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+import argparse
+import heapq
+import http.client
+import json
+import math
+import queue
+import random
+import sys
+import threading
+import time
+
+# replay reads agent journals with the agents' own reader
+sys.path.append(str(Path(__file__).resolve().parent / "local-log-agent"))
+from journal import SUFFIXES, Journal, entry_time, iter_jsonl, parse_time
+
+SEGMENT_SUFFIXES = set(SUFFIXES.values())
+
+DEFAULT_URL = "http://127.0.0.1:5000/log"
+AGENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+# latency/lag histograms: 1% buckets from 1 microsecond up
+HISTOGRAM_FLOOR = 1e-6
+HISTOGRAM_GROWTH = 1.01
+DEFAULT_MIX = {"network": 40, "chrome": 25, "file": 20, "windows": 10, "malware": 4, "policy": 1}
+
+MALWARE_EVENTS = [
+    "Suspicious PowerShell command executed",
+    "Executable with high entropy detected in temp folder",
+    "Outbound connection to known C2 server",
+    "Rundll32.exe launching unknown DLL",
+    "Malicious macro activity detected in Excel",
+]
+PROCESSES = ["chrome.exe", "msedge.exe", "Teams.exe", "OneDrive.exe", "svchost.exe", "python.exe"]
+REMOTE_NETS = ["142.250", "13.107", "52.96", "20.190", "104.16", "185.199"]
+FILE_EVENTS = ["CREATED", "MODIFIED", "MODIFIED", "MODIFIED", "DELETED", "MOVED"]
+FILE_PATHS = ["Documents\\report_{n}.docx", "Downloads\\setup_{n}.exe", "Desktop\\notes_{n}.txt",
+              "AppData\\Local\\Temp\\tmp{n}.tmp", "Pictures\\img_{n}.png"]
+POLICY_SETTINGS = [
+    ("Public Profile.State", "ON", "OFF"),
+    ("Domain Profile.Firewall Policy", "BlockInbound,AllowOutbound", "AllowInbound,AllowOutbound"),
+    ("UAC.EnableLUA", "Enabled", "Disabled"),
+    ("System Access.MinimumPasswordLength", "0", "12"),
+    ("Event Audit.AuditLogonEvents", "0", "3"),
+]
+WINDOWS_EVENT_IDS = [4624, 4624, 4624, 4634, 4672, 4688, 4625, 4740]
+SITES = ["https://github.com/iceybubble/Alertix", "https://stackoverflow.com/questions/{n}",
+         "https://www.youtube.com/watch?v={n}", "https://docs.python.org/3/library/",
+         "https://mail.google.com/mail/u/0/#inbox", "https://www.reddit.com/r/python/",
+         "https://news.ycombinator.com/item?id={n}", "https://www.linkedin.com/feed/"]
+CHROME_USER_AGENTS = [f"Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/126.0.{n}.0 Safari/537.36"
+                      for n in range(8)]
+
+
+# ---------------- Event shapes ----------------
+def _agent_time(ts):
+    return datetime.fromtimestamp(ts).strftime(AGENT_TIME_FORMAT)[:-3]
+
+
+def malware_event(rng, ts):
+    return {"log": rng.choice(MALWARE_EVENTS), "level": "WARNING", "time": _agent_time(ts),
+            "ip": "127.0.0.1", "user_agent": "python-requests/2.32.3", "source": "malware_agent"}
+
+
+def network_event(rng, ts):
+    remote = f"{rng.choice(REMOTE_NETS)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+    port = rng.choice([443, 443, 443, 80, 8080, 5228])
+    return {"time": _agent_time(ts), "level": "INFO",
+            "log": f"{rng.choice(PROCESSES)} connected to {remote}:{port}",
+            "ip": f"192.168.1.{rng.randint(2, 60)}", "user_agent": "network-agent/1.0",
+            "source": "network_agent"}
+
+
+def file_event(rng, ts):
+    path = "C:\\Users\\demo\\" + rng.choice(FILE_PATHS).format(n=rng.randint(1, 500))
+    return {"level": "INFO", "log": f"{rng.choice(FILE_EVENTS)} event on {path}",
+            "time": _agent_time(ts), "source": "file_access_agent"}
+
+
+def policy_event(rng, ts):
+    setting, previous, value = rng.choice(POLICY_SETTINGS)
+    if rng.random() < 0.5:
+        previous, value = value, previous
+    return {"time": _agent_time(ts), "level": "INFO",
+            "log": f"Policy setting changed: {setting} = {value} (was {previous})",
+            "ip": "192.168.1.10", "user_agent": "policy-agent/1.0", "source": "policy_agent",
+            "setting": setting, "value": value, "previous": previous,
+            "snapshot_hash": f"{rng.getrandbits(256):064x}"}
+
+
+def windows_event(rng, ts):
+    event_id = rng.choice(WINDOWS_EVENT_IDS)
+    return {"event_id": event_id, "source_name": "Microsoft-Windows-Security-Auditing",
+            "time_generated": datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+            "event_type": 16 if event_id == 4625 else 8, "event_category": 12544,
+            "computer_name": f"WS-{rng.randint(1, 40):03d}",
+            "string_inserts": ["S-1-5-18", "SYSTEM", "NT AUTHORITY", f"0x{rng.getrandbits(24):x}"],
+            "record_number": rng.randint(1, 10 ** 7)}
+
+
+def chrome_event(rng, ts):
+    url = rng.choice(SITES).format(n=rng.randint(1, 10 ** 6))
+    # browsers POST without an agent "time"; the user agent keys server-side sessions
+    return {"log": f"Tab updated: {url}", "url": url,
+            "_user_agent": rng.choice(CHROME_USER_AGENTS)}
+
+
+EVENT_SHAPES = {
+    "malware": malware_event,
+    "network": network_event,
+    "file": file_event,
+    "policy": policy_event,
+    "windows": windows_event,
+    "chrome": chrome_event,
+}
+
+
+def parse_mix(text):
+    """"network=5,chrome=3" -> {"network": 5.0, "chrome": 3.0}."""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in EVENT_SHAPES:
+            raise ValueError(f"unknown event shape {name!r} (choose from {', '.join(EVENT_SHAPES)})")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("mix needs at least one positive weight")
+    return mix
+
+
+# ---------------- Schedules ----------------
+def generate(seed, rate, mix=None, burst=1.0, duration=None, events=None, start=None):
+    """
+    Yield (offset_seconds, shape, event) for a seeded stream at `rate` events/s.
+
+    Stops after `duration` seconds or `events` events, whichever comes first.
+    """
+    rng = random.Random(seed)
+    mix = mix or DEFAULT_MIX
+    shapes, weights = list(mix), list(mix.values())
+    start = time.time() if start is None else start
+    burst = max(float(burst), 1.0)
+    offset, n = 0.0, 0
+    while (duration is None or offset < duration) and (events is None or n < events):
+        # geometric burst size with mean `burst`, then an exponential gap sized
+        # so that bursts arrive at rate / burst and the mean rate stays `rate`
+        size = 1
+        while rng.random() > 1 / burst:
+            size += 1
+        for _ in range(size):
+            if events is not None and n >= events:
+                return
+            shape = rng.choices(shapes, weights)[0]
+            yield offset, shape, EVENT_SHAPES[shape](rng, start + offset)
+            n += 1
+        offset += rng.expovariate(rate / burst)
+
+
+def _timed(events):
+    """(time, event) pairs; events without a usable time take their neighbour's."""
+    last = None
+    pending = []  # untimed events before the first timed one
+    for event in events:
+        t = entry_time(event)
+        if t is not None:
+            last = t
+        if last is None:
+            pending.append(event)
+            continue
+        for held in pending:
+            yield last, held
+        pending = []
+        yield last, event
+    for held in pending:
+        yield 0.0, held
+
+
+def replay(paths, speed=1.0, since=None, until=None):
+    """
+    Yield (offset_seconds, shape, event) for recorded events, spacing divided by speed.
+
+    Each path is an agent journal (its live file; rotated segments are found
+    through the journal index), a single .gz/.zst segment or a plain JSONL file.
+    Events stream in time order, merged across inputs, restricted to [since, until].
+    """
+    streams = []
+    for path in map(Path, paths):
+        if path.name.endswith(".index.json"):
+            continue
+        if path.suffix in SEGMENT_SUFFIXES:
+            events = (e for e in iter_jsonl(path) if _in_window(e, since, until))
+        else:
+            events = Journal(path).read_range(since, until)
+        streams.append(_timed(events))
+
+    first = None
+    for t, event in heapq.merge(*streams, key=lambda pair: pair[0]):
+        first = t if first is None else first
+        offset = (t - first) / speed if speed else 0.0
+        yield offset, event.get("source", "recorded"), event
+
+
+def _in_window(event, since, until):
+    t = entry_time(event)
+    return t is None or ((since is None or t >= since) and (until is None or t <= until))
+
+
+# ---------------- Sending ----------------
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.ok = 0
+        self.errors = Counter()
+        self.by_shape = Counter()
+        self.latencies = Histogram()
+        self.lags = Histogram()
+
+    def record(self, shape, status, latency, lag):
+        with self.lock:
+            self.sent += 1
+            self.by_shape[shape] += 1
+            self.latencies.add(latency)
+            self.lags.add(lag)
+            if status == 200:
+                self.ok += 1
+            else:
+                self.errors[str(status)] += 1
+
+
+class Histogram:
+    """
+    Log-scaled histogram of durations in seconds: fixed memory however long the
+    run, percentiles within HISTOGRAM_GROWTH relative error (max is exact).
+    """
+
+    def __init__(self):
+        self.buckets = Counter()   # 0 = below HISTOGRAM_FLOOR, else 1 + log-growth index
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, value):
+        if value < HISTOGRAM_FLOOR:
+            index = 0
+        else:
+            index = 1 + int(math.log(value / HISTOGRAM_FLOOR, HISTOGRAM_GROWTH))
+        self.buckets[index] += 1
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def _upper(self, index):
+        return HISTOGRAM_FLOOR * HISTOGRAM_GROWTH ** index if index else HISTOGRAM_FLOOR
+
+    def percentiles(self, points=(50, 90, 99, 99.9)):
+        if not self.count:
+            return {}
+        out, seen, ordered = {}, 0, sorted(self.buckets.items())
+        targets = iter((p, min(self.count - 1, int(self.count * p / 100))) for p in points)
+        point, rank = next(targets)
+        for index, n in ordered:
+            seen += n
+            while point is not None and rank < seen:
+                out[f"p{point:g}"] = min(self._upper(index), self.max)
+                point, rank = next(targets, (None, None))
+        out["max"] = self.max
+        return {k: round(v * 1000, 2) for k, v in out.items()}
+
+
+class Sender(threading.Thread):
+    """Worker with one keep-alive HTTP connection; sends each event when it is due."""
+
+    def __init__(self, url, jobs, stats, started, timeout):
+        super().__init__(daemon=True)
+        parts = urlsplit(url)
+        conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.connect = lambda: conn_class(parts.netloc, timeout=timeout)
+        self.path = parts.path or "/"
+        self.jobs = jobs
+        self.stats = stats
+        self.started = started
+        self.conn = None
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            offset, shape, event = job
+            delay = self.started + offset - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            lag = max(0.0, time.perf_counter() - self.started - offset)
+            status, latency = self.send(event)
+            self.stats.record(shape, status, latency, lag)
+        if self.conn:
+            self.conn.close()
+
+    def send(self, event):
+        event = dict(event)
+        headers = {"Content-Type": "application/json",
+                   "User-Agent": event.pop("_user_agent", None) or event.get("user_agent")
+                   or "alertix-loadgen/1.0"}
+        body = json.dumps(event).encode("utf-8")
+        sent_at = time.perf_counter()
+        for attempt in range(2):
+            try:
+                if self.conn is None:
+                    self.conn = self.connect()
+                self.conn.request("POST", self.path, body=body, headers=headers)
+                response = self.conn.getresponse()
+                response.read()
+                return response.status, time.perf_counter() - sent_at
+            except (http.client.HTTPException, OSError) as e:
+                # a dropped keep-alive connection gets one reconnect
+                self.conn.close()
+                self.conn = None
+                if attempt:
+                    return type(e).__name__, time.perf_counter() - sent_at
+
+
+def run(schedule, url=DEFAULT_URL, concurrency=8, timeout=10.0, progress=True):
+    """Send a schedule with `concurrency` workers; returns a report dict."""
+    stats = Stats()
+    jobs = queue.Queue(maxsize=concurrency * 64)
+    started = time.perf_counter()
+    workers = [Sender(url, jobs, stats, started, timeout) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+
+    last_print = started
+    for job in schedule:
+        jobs.put(job)
+        now = time.perf_counter()
+        if progress and now - last_print >= 1:
+            last_print = now
+            print(f"\rsent {stats.sent}  ok {stats.ok}  errors {sum(stats.errors.values())}  "
+                  f"({stats.sent / (now - started):,.0f} ev/s)", end="", flush=True)
+    for _ in workers:
+        jobs.put(None)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    if progress:
+        print()
+
+    return {
+        "events": stats.sent,
+        "ok": stats.ok,
+        "errors": dict(stats.errors),
+        "elapsed_seconds": round(elapsed, 3),
+        "achieved_rate": round(stats.sent / elapsed, 1) if elapsed else 0.0,
+        "by_shape": dict(stats.by_shape),
+        "latency_ms": stats.latencies.percentiles(),
+        "schedule_lag_ms": stats.lags.percentiles(),
+    }
+
+
+def write_schedule(schedule, out):
+    with open(out, "w", encoding="utf-8") as f:
+        n = 0
+        for _, _, event in schedule:
+            f.write(json.dumps(event) + "\n")
+            n += 1
+    return n
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generation and replay for /log")
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_gen = sub.add_parser("generate", help="send a seeded synthetic stream")
+    p_gen.add_argument("--rate", type=float, default=100.0, help="target events/second")
+    p_gen.add_argument("--duration", type=float, help="seconds of traffic")
+    p_gen.add_argument("--events", type=int, help="number of events")
+    p_gen.add_argument("--mix", default=",".join(f"{k}={v}" for k, v in DEFAULT_MIX.items()),
+                       help="weights per shape: " + ", ".join(EVENT_SHAPES))
+    p_gen.add_argument("--burst", type=float, default=1.0, help="mean events per burst")
+    p_gen.add_argument("--seed", type=int, default=1)
+    p_gen.add_argument("--out", help="write the stream as JSONL instead of sending it")
+
+    p_replay = sub.add_parser("replay", help="send recorded JSONL journals")
+    p_replay.add_argument("files", nargs="+", help="journal live files, segments or JSONL files")
+    p_replay.add_argument("--speed", type=float, default=1.0, help="N x recorded speed; 0 = unpaced")
+    p_replay.add_argument("--since", help='e.g. "2025-07-04 20:00:00"')
+    p_replay.add_argument("--until")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        if args.duration is None and args.events is None:
+            parser.error("generate needs --duration or --events")
+        schedule = generate(args.seed, args.rate, parse_mix(args.mix), args.burst,
+                            args.duration, args.events)
+        if args.out:
+            print(f"wrote {write_schedule(schedule, args.out)} events to {args.out}")
+            return
+    else:
+        schedule = replay(args.files, args.speed,
+                          parse_time(args.since) if args.since else None,
+                          parse_time(args.until) if args.until else None)
+
+    report = run(schedule, args.url, args.concurrency, args.timeout)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
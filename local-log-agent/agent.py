@@ -1,10 +1,12 @@
 import win32evtlog
-import json
 import requests
 import time
 import os
 from datetime import datetime
 
+from journal import Journal, KEEP_SEGMENTS
+from log_sender import send_entries
+
 import ctypes
 import sys
 
@@ -26,6 +28,7 @@ SIEM_ENDPOINT = "http://localhost:5000/log"
 LOG_DIR = "logs"
 LOG_FILE = os.path.join(LOG_DIR, "windows_logs.jsonl")
 LAST_RECORD_FILE = os.path.join(LOG_DIR, "last_record.txt")
+journal = Journal(LOG_FILE, keep_segments=KEEP_SEGMENTS, time_fields=("time_generated",))
 
 def get_last_record_number():
     if os.path.exists(LAST_RECORD_FILE):
@@ -74,21 +77,12 @@ def fetch_logs(since_record):
 def send_logs(logs):
     try:
         requests.get("http://localhost:5000", timeout=2)
-        for log in logs:
-            try:
-                requests.post(SIEM_ENDPOINT, json=log, timeout=2)
-            except:
-                pass
+        send_entries(logs, SIEM_ENDPOINT, timeout=2)
     except:
         pass
 
 def save_logs_to_file(logs):
-    if not logs:
-        return
-    os.makedirs(LOG_DIR, exist_ok=True)
-    with open(LOG_FILE, "a", encoding='utf-8') as f:
-        for log in logs:
-            f.write(json.dumps(log) + "\n")
+    journal.append(logs)
 
 def main():
     print("[*] Starting Windows Log Agent")
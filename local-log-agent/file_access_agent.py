@@ -1,10 +1,11 @@
 import os
 import json
-import requests
 from datetime import datetime, timezone
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from log_sender import send_entries
+
 MONITOR_PATH = os.path.expanduser("~")  # You can change this to any directory
 SERVER_URL = "http://localhost:5000/log"
 
@@ -23,12 +24,7 @@ class FileAccessHandler(FileSystemEventHandler):
         send_log_to_server(log_entry)
 
 def send_log_to_server(log_entry):
-    try:
-        response = requests.post(SERVER_URL, json=log_entry)
-        if response.status_code != 200:
-            print("Failed to send log:", response.text)
-    except Exception as e:
-        print("Error sending log:", e)
+    send_entries([log_entry], SERVER_URL)
 
 def main():
     event_handler = FileAccessHandler()
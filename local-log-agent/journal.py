@@ -0,0 +1,307 @@
+"""
+Rotating, compressed local journals for the agents.
+
+Each agent appends its events to a live JSONL file (e.g. logs/network_log.json)
+that stays open between batches. When the live file passes max_bytes or
+max_age it is closed, compressed into "<name>.<stamp>.gz" (or ".zst" when
+zstandard is installed and ALERTIX_JOURNAL_COMPRESSION=zstd) and recorded in
+"<name>.index.json" with its min/max event time and count.
+
+read_range() consults that index and only opens the segments whose time span
+overlaps the window, so an agent can replay e.g. the last two hours to the
+server after an outage without scanning its whole history:
+
+    python journal.py query logs/network_log.json --since "2025-07-04 20:00:00"
+    python journal.py replay logs/network_log.json --since "2025-07-04 20:00:00"
+
+Rotation and retention happen only inside the agent that owns the journal;
+the CLI just reads, so it never unlinks a file an agent still has open.
+"""
+from datetime import datetime
+from pathlib import Path
+import argparse
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is always available
+    zstandard = None
+
+COMPRESSION = os.getenv("ALERTIX_JOURNAL_COMPRESSION", "gzip").lower()
+MAX_BYTES = 8 * 1024 * 1024
+MAX_AGE_SECONDS = 24 * 3600
+KEEP_SEGMENTS = int(os.getenv("ALERTIX_JOURNAL_KEEP_SEGMENTS", "50"))
+SEGMENT_STAMP = "%Y%m%dT%H%M%S"
+SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+TIME_FIELDS = ("time", "time_generated")
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S,%f", "%Y-%m-%d %H:%M:%S")
+
+
+def entry_time(entry, fields=TIME_FIELDS):
+    """Event time as epoch seconds, or None when the entry carries no usable time."""
+    for field in fields:
+        value = entry.get(field)
+        if isinstance(value, (int, float)):
+            return value / 1000 if value > 1e11 else float(value)  # wire format sends ms
+        if not isinstance(value, str):
+            continue
+        return parse_time(value)
+    return None
+
+
+def parse_time(value):
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).timestamp()
+        except ValueError:
+            pass
+    try:
+        return datetime.fromisoformat(value.replace(",", ".")).timestamp()
+    except ValueError:
+        return None
+
+
+def open_segment(path, mode="rt"):
+    """Open a compressed segment (by suffix) for reading or writing."""
+    path = Path(path)
+    if path.suffix == SUFFIXES["zstd"]:
+        if zstandard is None:
+            raise RuntimeError(f"{path} is zstd-compressed but zstandard is not installed")
+        return zstandard.open(path, mode, encoding="utf-8" if "t" in mode else None)
+    return gzip.open(path, mode, encoding="utf-8" if "t" in mode else None)
+
+
+class Journal:
+    """Append-only JSONL journal with size/age rotation and a per-segment time index."""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, max_age=MAX_AGE_SECONDS,
+                 compression=COMPRESSION, keep_segments=None, time_fields=TIME_FIELDS):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.path.with_name(self.path.name + ".index.json")
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        if compression == "zstd" and zstandard is None:
+            compression = "gzip"
+        self.suffix = SUFFIXES.get(compression, SUFFIXES["gzip"])
+        self.keep_segments = keep_segments
+        self.time_fields = time_fields
+        self._lock = threading.Lock()
+        self._file = None
+        self._scan_live()
+
+    # ---------------- Writing ----------------
+    def _scan_live(self):
+        """Recover the live file's time span after a restart (it is at most max_bytes)."""
+        self.min_time = self.max_time = None
+        self.count = 0
+        if self.path.exists():
+            for entry in iter_jsonl(self.path):
+                self._track(entry_time(entry, self.time_fields))
+        self.opened_at = self.min_time or time.time()
+
+    def _track(self, ts):
+        self.count += 1
+        if ts is None:
+            return
+        if self.min_time is None or ts < self.min_time:
+            self.min_time = ts
+        if self.max_time is None or ts > self.max_time:
+            self.max_time = ts
+
+    def append(self, entries):
+        """Write a batch of events and rotate if the live file is now due."""
+        if not entries:
+            return
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            now = time.time()
+            for entry in entries:
+                ts = entry_time(entry, self.time_fields)
+                self._track(ts if ts is not None else now)
+                self._file.write(json.dumps(entry, default=str) + "\n")
+            self._file.flush()
+            if self._due(now):
+                self._rotate(now)
+
+    def _due(self, now):
+        if self.count == 0:
+            return False
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        return bool(self.max_age and now - self.opened_at >= self.max_age)
+
+    def rotate(self):
+        """Force rotation of the live file; returns the new segment path or None."""
+        with self._lock:
+            return self._rotate(time.time())
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+    def _rotate(self, now):
+        if self._file:
+            self._file.close()
+            self._file = None
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return None
+
+        stamp = datetime.fromtimestamp(now).strftime(SEGMENT_STAMP)
+        segment = self.path.with_name(f"{self.path.name}.{stamp}{self.suffix}")
+        n = 1
+        while segment.exists():
+            segment = self.path.with_name(f"{self.path.name}.{stamp}-{n}{self.suffix}")
+            n += 1
+
+        # load (or rebuild) the index before the new segment becomes visible to it
+        index = self.load_index()
+        tmp = segment.with_name("." + segment.name)  # hidden, but keeps the codec suffix
+        with open(self.path, "rb") as src, open_segment(tmp, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(tmp, segment)
+
+        index.append({"segment": segment.name, "min_time": self.min_time,
+                      "max_time": self.max_time, "count": self.count,
+                      "bytes": segment.stat().st_size})
+        if self.keep_segments is not None and len(index) > self.keep_segments:
+            for old in index[:len(index) - self.keep_segments]:
+                (self.path.parent / old["segment"]).unlink(missing_ok=True)
+            index = index[len(index) - self.keep_segments:]
+        self._save_index(index)
+
+        # the index already covers the segment, so a crash here only duplicates events
+        try:
+            self.path.unlink()
+        except PermissionError:
+            # on Windows a reader (journal.py query/replay, loadgen replay) still has the
+            # live file open; it cannot be removed then, but it can be emptied
+            open(self.path, "w").close()
+        self.min_time = self.max_time = None
+        self.count = 0
+        self.opened_at = now
+        return segment
+
+    # ---------------- Index ----------------
+    def segments(self):
+        return sorted(p for suffix in SUFFIXES.values()
+                      for p in self.path.parent.glob(f"{self.path.name}.*{suffix}"))
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self.rebuild_index() if self.segments() else []
+        except ValueError:
+            return self.rebuild_index()
+
+    def _save_index(self, index):
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp, self.index_path)
+
+    def rebuild_index(self):
+        """Rescan every segment, e.g. when the index file was lost."""
+        index = []
+        for segment in self.segments():
+            entries = [entry_time(e, self.time_fields) for e in iter_jsonl(segment)]
+            times = [t for t in entries if t is not None]
+            index.append({"segment": segment.name,
+                          "min_time": min(times) if times else None,
+                          "max_time": max(times) if times else None,
+                          "count": len(entries), "bytes": segment.stat().st_size})
+        index.sort(key=lambda s: (s["min_time"] is None, s["min_time"] or 0))
+        self._save_index(index)
+        return index
+
+    # ---------------- Reading ----------------
+    def read_range(self, start=None, end=None):
+        """
+        Yield events with start <= time <= end (epoch seconds, either may be None),
+        oldest segment first, opening only segments whose indexed span overlaps.
+        """
+        def overlaps(lo, hi):
+            if lo is None or hi is None:
+                return True
+            return (start is None or hi >= start) and (end is None or lo <= end)
+
+        with self._lock:
+            if self._file:
+                self._file.flush()
+            sources = [self.path.parent / s["segment"] for s in self.load_index()
+                       if overlaps(s["min_time"], s["max_time"])]
+            if self.path.exists() and self.count and overlaps(self.min_time, self.max_time):
+                sources.append(self.path)
+
+        for source in sources:
+            if not source.exists():
+                continue
+            for entry in iter_jsonl(source):
+                ts = entry_time(entry, self.time_fields)
+                if ts is None or ((start is None or ts >= start) and (end is None or ts <= end)):
+                    yield entry
+
+
+def iter_jsonl(path):
+    """Stream events from a live file or compressed segment, skipping torn lines."""
+    path = Path(path)
+    opener = open_segment if path.suffix in SUFFIXES.values() else (
+        lambda p, mode: open(p, mode, encoding="utf-8", errors="replace"))
+    with opener(path, "rt") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agent journal tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("query", "print events in a time range as JSONL"),
+                            ("replay", "send events in a time range to the server")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("journal")
+        p.add_argument("--since", help='e.g. "2025-07-04 20:00:00"')
+        p.add_argument("--until")
+    p_replay = sub.choices["replay"]
+    p_replay.add_argument("--url", default="http://127.0.0.1:5000/log")
+    p_replay.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    journal = Journal(args.journal)
+
+    start = parse_time(args.since) if args.since else None
+    end = parse_time(args.until) if args.until else None
+    if args.command == "query":
+        for entry in journal.read_range(start, end):
+            print(json.dumps(entry, default=str))
+        return
+
+    from log_sender import send_entries
+    batch, sent, total = [], 0, 0
+    for entry in journal.read_range(start, end):
+        batch.append(entry)
+        if len(batch) >= args.batch:
+            sent += send_entries(batch, args.url)
+            total += len(batch)
+            batch = []
+    if batch:
+        sent += send_entries(batch, args.url)
+        total += len(batch)
+    print(f"replayed {sent}/{total} events")
+
+
+if __name__ == "__main__":
+    main()
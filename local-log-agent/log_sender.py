@@ -0,0 +1,51 @@
+"""
+Shared sender for the local agents.
+
+JSON (one POST per event) stays the default. Setting ALERTIX_WIRE_FORMAT=msgpack
+makes agents send each batch as a single application/x-alertix-msgpack body
+(see wire_format.py). Falls back to JSON when msgpack is not installed.
+"""
+from pathlib import Path
+import os
+import sys
+
+import requests
+
+# the wire format is shared with the server and lives at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+import wire_format
+
+SERVER_URL = "http://127.0.0.1:5000/log"
+WIRE_FORMAT = os.getenv("ALERTIX_WIRE_FORMAT", "json").lower()
+
+
+def use_binary():
+    return WIRE_FORMAT == "msgpack" and wire_format.available()
+
+
+def send_entries(entries, url=SERVER_URL, timeout=None):
+    """Send a batch of events; returns the number the server accepted."""
+    if not entries:
+        return 0
+    if use_binary():
+        try:
+            response = requests.post(url, data=wire_format.encode(entries),
+                                     headers={"Content-Type": wire_format.MIMETYPE}, timeout=timeout)
+            if response.status_code == 200:
+                return len(entries)
+            print(f"Failed to send logs: {response.status_code} {response.text}")
+        except Exception as e:
+            print(f"Failed to send logs: {e}")
+        return 0
+
+    sent = 0
+    for entry in entries:
+        try:
+            response = requests.post(url, json=entry, timeout=timeout)
+            if response.status_code == 200:
+                sent += 1
+            else:
+                print(f"Failed to send log: {response.status_code} {response.text}")
+        except Exception as e:
+            print(f"Failed to send log: {e}")
+    return sent
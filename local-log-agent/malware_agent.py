@@ -1,8 +1,9 @@
-import requests
 import time
 import random
 from datetime import datetime
 
+from log_sender import send_entries
+
 SIEM_ENDPOINT = "http://localhost:5000/log"
 
 MALWARE_EVENTS = [
@@ -25,12 +26,6 @@ def generate_malware_log():
 
 while True:
     log = generate_malware_log()
-    try:
-        response = requests.post(SIEM_ENDPOINT, json=log)
-        if response.status_code == 200:
-            print("Malware log sent.")
-        else:
-            print(f"Failed to send log: {response.status_code} {response.text}")
-    except Exception as e:
-        print(f"Failed to send log: {e}")
+    if send_entries([log], SIEM_ENDPOINT):
+        print("Malware log sent.")
     time.sleep(5)
@@ -1,15 +1,17 @@
 import time
-import json
 import socket
 import psutil
-import requests
 from datetime import datetime
 import os
 
+from journal import Journal, KEEP_SEGMENTS
+from log_sender import send_entries
+
 LOG_FILE = "logs/network_log.json"
 SERVER_URL = "http://127.0.0.1:5000/log"  # Your server endpoint
 
 os.makedirs("logs", exist_ok=True)
+journal = Journal(LOG_FILE, keep_segments=KEEP_SEGMENTS)
 
 def get_connection_info():
     connections = []
@@ -34,19 +36,10 @@ def get_connection_info():
     return connections
 
 def write_log(data):
-    with open(LOG_FILE, "a") as f:
-        for entry in data:
-            json.dump(entry, f)
-            f.write("\n")
+    journal.append(data)
 
 def send_to_server(data):
-    for entry in data:
-        try:
-            response = requests.post(SERVER_URL, json=entry)
-            if response.status_code != 200:
-                print(f"Failed to send log: {response.status_code} {response.text}")
-        except Exception as e:
-            print(f"Failed to send log: {e}")
+    send_entries(data, SERVER_URL)
 
 # This was missing:
 def monitor():
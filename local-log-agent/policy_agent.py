@@ -1,27 +1,41 @@
 import os
 import json
 import socket
-import requests
 import subprocess
+import tempfile
 from datetime import datetime
 
+from journal import Journal, KEEP_SEGMENTS
+from log_sender import send_entries
+from policy_parsers import (parse_inf, parse_netsh_firewall, read_policy_file,
+                            snapshot_hash, diff_snapshots)
+
 LOG_FILE = "logs/policy_log.json"
+SNAPSHOT_FILE = "logs/policy_snapshot.json"
 SERVER_URL = "http://127.0.0.1:5000/log"  # Your server endpoint
 
 os.makedirs("logs", exist_ok=True)
+journal = Journal(LOG_FILE, keep_segments=KEEP_SEGMENTS)
 
-def get_firewall_status():
+# Each collector returns {setting: value}, or None when the source could not be
+# read (no admin rights, tool missing, non-zero exit). A failed source keeps its
+# previous values so an outage is never reported as every setting being removed.
+def get_firewall_settings():
     try:
         result = subprocess.run(
             ["netsh", "advfirewall", "show", "allprofiles"],
             capture_output=True,
             text=True
         )
-        return result.stdout.strip()
     except Exception as e:
-        return f"Error fetching firewall status: {e}"
+        print(f"Error fetching firewall status: {e}")
+        return None
+    if result.returncode != 0 or not result.stdout.strip():
+        print(f"Error fetching firewall status: netsh exited with {result.returncode}")
+        return None
+    return parse_netsh_firewall(result.stdout) or None
 
-def get_uac_status():
+def get_uac_settings():
     try:
         import winreg
         key = winreg.OpenKey(
@@ -30,46 +44,123 @@ def get_uac_status():
         )
         value, _ = winreg.QueryValueEx(key, "EnableLUA")
         winreg.CloseKey(key)
-        return "Enabled" if value == 1 else "Disabled"
+        return {"UAC.EnableLUA": "Enabled" if value == 1 else "Disabled"}
+    except Exception as e:
+        print(f"Error fetching UAC status: {e}")
+        return None
+
+def get_security_policy():
+    # secedit writes a UTF-16 INF; export to a temp file and parse it
+    fd, path = tempfile.mkstemp(suffix=".inf")
+    os.close(fd)
+    try:
+        result = subprocess.run(
+            ["secedit", "/export", "/cfg", path, "/quiet"],
+            capture_output=True
+        )
+        if result.returncode != 0 or os.path.getsize(path) == 0:
+            print(f"Error exporting security policy: secedit exited with {result.returncode}")
+            return None
+        return parse_inf(read_policy_file(path)) or None
     except Exception as e:
-        return f"Error fetching UAC status: {e}"
+        print(f"Error exporting security policy: {e}")
+        return None
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+COLLECTORS = {
+    "firewall": get_firewall_settings,
+    "uac": get_uac_settings,
+    "security_policy": get_security_policy,
+}
+
+def collect_snapshot(previous_sources):
+    """{source: settings} for every collector, reusing the previous values of failed ones."""
+    sources = {}
+    for name, collect in COLLECTORS.items():
+        settings = collect()
+        if settings is None:
+            settings = previous_sources.get(name)
+            if settings is None:
+                continue
+        sources[name] = settings
+    return sources
 
-def create_log_entry(message):
+def flatten(sources):
+    settings = {}
+    for source_settings in sources.values():
+        settings.update(source_settings)
+    return settings
+
+def load_snapshot():
+    try:
+        with open(SNAPSHOT_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"hash": None, "sources": {}}
+
+def save_snapshot(sources, digest):
+    tmp = SNAPSHOT_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"hash": digest, "sources": sources}, f, indent=2, sort_keys=True)
+    os.replace(tmp, SNAPSHOT_FILE)
+
+def create_log_entry(message, **fields):
     return {
         "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S,%f")[:-3],
         "level": "INFO",
         "log": message,
         "ip": socket.gethostbyname(socket.gethostname()),
         "user_agent": "policy-agent/1.0",
-        "source": "policy_agent"
+        "source": "policy_agent",
+        **fields
     }
 
+def change_entries(changes, digest, previous_digest):
+    entries = []
+    for setting, previous, value in changes:
+        if previous is None:
+            message = f"Policy setting added: {setting} = {value}"
+        elif value is None:
+            message = f"Policy setting removed: {setting} (was {previous})"
+        else:
+            message = f"Policy setting changed: {setting} = {value} (was {previous})"
+        entries.append(create_log_entry(
+            message,
+            setting=setting,
+            value=value,
+            previous=previous,
+            snapshot_hash=digest,
+            previous_snapshot_hash=previous_digest
+        ))
+    return entries
+
 def write_log(entries):
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        for entry in entries:
-            json.dump(entry, f)
-            f.write("\n")
+    journal.append(entries)
 
 def send_to_server(entries):
-    for entry in entries:
-        try:
-            response = requests.post(SERVER_URL, json=entry)
-            if response.status_code != 200:
-                print(f"Failed to send log: {response.status_code} {response.text}")
-        except Exception as e:
-            print(f"Failed to send log: {e}")
+    return send_entries(entries, SERVER_URL)
 
 def main():
-    entries = []
-
-    firewall_status = get_firewall_status()
-    entries.append(create_log_entry(f"Firewall status:\n{firewall_status}"))
+    last = load_snapshot()
+    previous_sources = last.get("sources", {})
+    sources = collect_snapshot(previous_sources)
+    if not sources:
+        print("No policy settings collected; keeping the previous snapshot")
+        return
 
-    uac_status = get_uac_status()
-    entries.append(create_log_entry(f"UAC is {uac_status}"))
+    settings = flatten(sources)
+    digest = snapshot_hash(settings)
+    if digest == last.get("hash"):
+        return
 
+    # only settings that differ from the last snapshot the server acknowledged
+    entries = change_entries(diff_snapshots(flatten(previous_sources), settings),
+                             digest, last.get("hash"))
     write_log(entries)
-    send_to_server(entries)
+    if send_to_server(entries) == len(entries):
+        save_snapshot(sources, digest)
 
 if __name__ == "__main__":
     main()
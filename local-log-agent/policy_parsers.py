@@ -0,0 +1,100 @@
+"""
+Parsers that turn policy tool output into flat {setting: value} snapshots.
+
+* parse_inf             - secedit /export output (UTF-16 with BOM, INI-like)
+* parse_netsh_firewall  - `netsh advfirewall show allprofiles` text
+
+Setting names are "<section>.<key>", e.g. "System Access.MinimumPasswordAge"
+or "Domain Profile.State", so snapshots from both sources can share one dict.
+Nothing here touches Windows APIs, so the parsers run anywhere:
+
+    python policy_parsers.py current_policy.inf samples/netsh_allprofiles.txt
+"""
+from hashlib import sha256
+from pathlib import Path
+import json
+import re
+import sys
+
+# secedit section that only describes the file itself
+INF_SKIP_SECTIONS = {"Unicode", "Version"}
+NETSH_PROFILE = re.compile(r"^(\w[\w ]*? Profile) Settings:\s*$")
+NETSH_SETTING = re.compile(r"^(\S.*?)\s{2,}(\S.*)$")
+
+
+def decode_policy_bytes(raw):
+    """Decode secedit output, which is UTF-16 LE with a BOM unless redirected."""
+    if raw[:2] in (b"\xff\xfe", b"\xfe\xff"):
+        return raw.decode("utf-16")
+    if raw[:3] == b"\xef\xbb\xbf":
+        return raw[3:].decode("utf-8")
+    if len(raw) > 1 and raw[1:2] == b"\x00":
+        return raw.decode("utf-16-le")
+    return raw.decode("utf-8", errors="replace")
+
+
+def read_policy_file(path):
+    return decode_policy_bytes(Path(path).read_bytes())
+
+
+def parse_inf(text):
+    """Parse INF export text into {"Section.Key": "value"}."""
+    settings = {}
+    section = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line[0] == ";":
+            continue
+        if line[0] == "[" and line[-1] == "]":
+            section = line[1:-1]
+            continue
+        if section is None or section in INF_SKIP_SECTIONS:
+            continue
+        key, sep, value = line.partition("=")
+        if sep:
+            settings[f"{section}.{key.strip()}"] = value.strip()
+    return settings
+
+
+def parse_netsh_firewall(text):
+    """Parse `netsh advfirewall show allprofiles` into {"Domain Profile.State": "ON", ...}."""
+    settings = {}
+    profile = None
+    for line in text.splitlines():
+        line = line.rstrip()
+        header = NETSH_PROFILE.match(line)
+        if header:
+            profile = header.group(1)
+            continue
+        if profile is None:
+            continue
+        match = NETSH_SETTING.match(line)
+        if match:
+            settings[f"{profile}.{match.group(1)}"] = match.group(2).strip()
+    return settings
+
+
+def snapshot_hash(settings):
+    """Stable sha256 of a snapshot, independent of key order."""
+    canonical = json.dumps(settings, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def diff_snapshots(previous, current):
+    """[(setting, previous_value, value)] for every added, changed or removed setting."""
+    changes = []
+    for key in sorted(previous.keys() | current.keys()):
+        old, new = previous.get(key), current.get(key)
+        if old != new:
+            changes.append((key, old, new))
+    return changes
+
+
+if __name__ == "__main__":
+    for path in sys.argv[1:]:
+        text = read_policy_file(path)
+        parse = parse_inf if path.lower().endswith(".inf") else parse_netsh_firewall
+        parsed = parse(text)
+        print(f"{path}: {len(parsed)} settings, sha256 {snapshot_hash(parsed)}")
+        for key, value in parsed.items():
+            print(f"  {key} = {value}")
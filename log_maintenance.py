@@ -0,0 +1,293 @@
+"""
+Maintenance for siem-log-server/logs/server.log: streaming compaction,
+rotation into gzip segments and retention of old segments.
+
+Writers and maintenance coordinate through an advisory lock on a sidecar
+"<log>.lock" file. Writers hold it only while appending a record and do not
+keep the log open between records, so a compaction or rotation can swap the
+file with an atomic rename underneath a running server.
+
+    python log_maintenance.py rotate --max-mb 50 --max-age-hours 24
+    python log_maintenance.py retain --keep-days 30 --keep-segments 20
+    python log_maintenance.py compact --drop "Tab updated:"
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+import argparse
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+DEFAULT_LOG_PATH = Path(__file__).parent / "siem-log-server" / "logs" / "server.log"
+ARCHIVE_SUFFIX = ".gz"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+SEGMENT_STAMP = "%Y%m%dT%H%M%S"
+
+# app.logger lines start with "2025-08-23 18:20:42,322 - INFO - ..."
+LOGGER_RECORD_START = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - [A-Z]+ - ")
+# write_pretty_log blocks open with a "level: INFO" line ...
+PRETTY_RECORD_START = "level: "
+# ... and carry a "time: 2025-07-04 20:39:15,480" line
+PRETTY_TIME_LINE = re.compile(r"^time: (\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})")
+
+_thread_lock = threading.Lock()
+
+
+# ---------------- Writer coordination ----------------
+@contextmanager
+def log_lock(path):
+    """Exclusive advisory lock shared by log writers and maintenance jobs."""
+    with _thread_lock, open(f"{path}.lock", "a+b") as fh:
+        if os.name == "nt":
+            import msvcrt
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def append_record(path, text, encoding="utf-8"):
+    """Append one record to the log while holding the writer lock."""
+    with log_lock(path):
+        with open(path, "a", encoding=encoding) as f:
+            f.write(text)
+
+
+# ---------------- Reading ----------------
+def split_records(lines):
+    """
+    Group lines into records for either log format.
+
+    A record starts at an app.logger timestamp line, a pretty block's "level: "
+    line (both servers append to the same file, so a block can directly follow
+    a logger line) or after a blank line. Records keep their trailing blank
+    lines, so writing every record back reproduces the input byte for byte.
+    """
+    record = []
+    for line in lines:
+        if record and line.strip() and (
+            not record[-1].strip() or LOGGER_RECORD_START.match(line)
+            or line.startswith(PRETTY_RECORD_START)
+        ):
+            yield "".join(record)
+            record = []
+        record.append(line)
+    if record:
+        yield "".join(record)
+
+
+def iter_records(path, encoding="utf-8"):
+    """Stream records from a log without loading the file."""
+    with open(path, "r", encoding=encoding, errors="replace", newline="") as f:
+        yield from split_records(f)
+
+
+def record_time(record):
+    """Timestamp of a record in either format, or None if it has none."""
+    match = LOGGER_RECORD_START.match(record)
+    if not match:
+        for line in record.splitlines():
+            match = PRETTY_TIME_LINE.match(line)
+            if match:
+                break
+    if not match:
+        return None
+    try:
+        return datetime.strptime(match.group(1), TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+# ---------------- Compaction ----------------
+def compact(path, keep, encoding="utf-8"):
+    """
+    Rewrite the log keeping only records for which keep(record) is true.
+
+    Records stream into a temp file in the same directory which then replaces
+    the log with an atomic rename, so a crash leaves either the old or the new
+    file intact. Returns (kept, dropped) record counts.
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0, 0
+
+    kept = dropped = 0
+    with log_lock(path):
+        fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding=encoding, newline="") as out:
+                for record in iter_records(path, encoding):
+                    if keep(record):
+                        out.write(record)
+                        kept += 1
+                    else:
+                        dropped += 1
+                out.flush()
+                os.fsync(out.fileno())
+            shutil.copymode(path, tmp_name)
+            os.replace(tmp_name, path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+    return kept, dropped
+
+
+# ---------------- Rotation & retention ----------------
+def first_record_time(path):
+    for record in iter_records(path):
+        ts = record_time(record)
+        if ts:
+            return ts
+    return None
+
+
+def needs_rotation(path, max_bytes=None, max_age=None, now=None):
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return False
+    if max_bytes and path.stat().st_size >= max_bytes:
+        return True
+    if max_age:
+        started = first_record_time(path)
+        if started and (now or datetime.now()) - started >= max_age:
+            return True
+    return False
+
+
+def rotate(path, max_bytes=None, max_age=None, archive_dir=None, now=None, force=False):
+    """
+    Move the live log aside and compress it into "<name>.<stamp>.gz".
+
+    Only the rename happens under the writer lock; compression streams from
+    the detached segment afterwards. Returns the archive path, or None when
+    no rotation was needed.
+    """
+    path = Path(path)
+    archive_dir = Path(archive_dir) if archive_dir else path.parent
+    archive_dir.mkdir(parents=True, exist_ok=True)
+
+    with log_lock(path):
+        if not force and not needs_rotation(path, max_bytes, max_age, now):
+            return None
+        if not path.exists():
+            return None
+        stamp = (now or datetime.now()).strftime(SEGMENT_STAMP)
+        segment = archive_dir / f"{path.name}.{stamp}"
+        n = 1
+        while segment.exists() or segment.with_name(segment.name + ARCHIVE_SUFFIX).exists():
+            segment = archive_dir / f"{path.name}.{stamp}-{n}"
+            n += 1
+        os.replace(path, segment)
+        path.touch()
+
+    archive = segment.with_name(segment.name + ARCHIVE_SUFFIX)
+    tmp_archive = archive.with_name("." + archive.name + ".tmp")
+    with open(segment, "rb") as src, gzip.open(tmp_archive, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    os.replace(tmp_archive, archive)
+    segment.unlink()
+    return archive
+
+
+def list_segments(path, archive_dir=None):
+    """Archived segments for a log, oldest first."""
+    path = Path(path)
+    archive_dir = Path(archive_dir) if archive_dir else path.parent
+    return sorted(archive_dir.glob(f"{path.name}.*{ARCHIVE_SUFFIX}"))
+
+
+def retain(path, keep_days=None, keep_segments=None, max_total_bytes=None,
+           archive_dir=None, now=None):
+    """Delete archived segments past the age, count or total-size limits. Returns removed paths."""
+    segments = list_segments(path, archive_dir)
+    now = now or datetime.now()
+    removed = []
+
+    if keep_days is not None:
+        cutoff = (now - timedelta(days=keep_days)).timestamp()
+        for seg in list(segments):
+            if seg.stat().st_mtime < cutoff:
+                segments.remove(seg)
+                removed.append(seg)
+
+    if keep_segments is not None and len(segments) > keep_segments:
+        excess = len(segments) - keep_segments
+        removed.extend(segments[:excess])
+        segments = segments[excess:]
+
+    if max_total_bytes is not None:
+        total = sum(s.stat().st_size for s in segments)
+        while segments and total > max_total_bytes:
+            seg = segments.pop(0)
+            total -= seg.stat().st_size
+            removed.append(seg)
+
+    for seg in removed:
+        seg.unlink(missing_ok=True)
+    return removed
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="server.log maintenance")
+    parser.add_argument("--log", default=str(DEFAULT_LOG_PATH))
+    parser.add_argument("--archive-dir", default=None)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_rotate = sub.add_parser("rotate", help="rotate the live log into a gzip segment")
+    p_rotate.add_argument("--max-mb", type=float)
+    p_rotate.add_argument("--max-age-hours", type=float)
+    p_rotate.add_argument("--force", action="store_true")
+
+    p_retain = sub.add_parser("retain", help="prune archived segments")
+    p_retain.add_argument("--keep-days", type=float)
+    p_retain.add_argument("--keep-segments", type=int)
+    p_retain.add_argument("--max-total-mb", type=float)
+
+    p_compact = sub.add_parser("compact", help="drop records containing a substring")
+    p_compact.add_argument("--drop", action="append", required=True,
+                           help="case-insensitive substring; may be repeated")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "rotate":
+        archive = rotate(
+            args.log,
+            max_bytes=int(args.max_mb * 1024 * 1024) if args.max_mb else None,
+            max_age=timedelta(hours=args.max_age_hours) if args.max_age_hours else None,
+            archive_dir=args.archive_dir,
+            force=args.force,
+        )
+        print(f"Rotated to {archive}" if archive else "No rotation needed")
+    elif args.command == "retain":
+        removed = retain(
+            args.log,
+            keep_days=args.keep_days,
+            keep_segments=args.keep_segments,
+            max_total_bytes=int(args.max_total_mb * 1024 * 1024) if args.max_total_mb else None,
+            archive_dir=args.archive_dir,
+        )
+        print(f"Removed {len(removed)} segment(s)")
+    elif args.command == "compact":
+        needles = [d.lower() for d in args.drop]
+        kept, dropped = compact(args.log, lambda r: not any(n in r.lower() for n in needles))
+        print(f"Kept {kept} record(s), dropped {dropped}")
+
+
+if __name__ == "__main__":
+    main()
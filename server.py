@@ -1,202 +1,161 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Blueprint, current_app, request, jsonify, send_file
 from flask_cors import CORS
-from elasticsearch import Elasticsearch
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
+from functools import lru_cache
 from pathlib import Path
+import atexit
 import logging
 import os
 import io
-import re
 
-# ---- chart backend ----
-import matplotlib
-matplotlib.use("Agg")  # headless rendering for servers
-import matplotlib.pyplot as plt
+from chrome_logs_api import chrome_logs
+from classifier import classify_event
+from es_client import get_es, INDEX_NAME
+from log_maintenance import log_lock
+from sessions import navigation_url, sessionizer
+from sketches import SketchWindow
+from threat_intel import get_intel
+from timeseries import (BucketCache, DEFAULT_MAX_POINTS, MAX_POINTS_LIMIT, MAX_WINDOW_HOURS,
+                        SERIES_FIELDS, timeseries)
+import wire_format
 
-# ---------------- Flask Setup ----------------
-app = Flask(__name__)
-CORS(app, origins=["http://localhost:3000"], supports_credentials=True)
-app.secret_key = "supersecret"  # Replace with a secure key in production
+# Heavy dependencies (elasticsearch, matplotlib) are imported on first use so that
+# importing this module stays cheap; see check_import_time.py for the budget.
 
 # ---------------- Log Directory Setup ----------------
 log_dir = Path(__file__).parent / "siem-log-server" / "logs"
-log_dir.mkdir(parents=True, exist_ok=True)
 log_file_path = log_dir / "server.log"
 
+# closed /stats/timeseries buckets, shared across requests
+timeseries_cache = BucketCache()
+
+# fixed-memory distinct/top-k sketches over the last 24h in 5 minute buckets
+sketch_window = SketchWindow(bucket_seconds=300, buckets=288)
+
+
+# ---- chart backend ----
+@lru_cache(maxsize=None)
+def get_pyplot():
+    import matplotlib
+    matplotlib.use("Agg")  # headless rendering for servers
+    import matplotlib.pyplot as plt
+    return plt
+
+
 # ---------------- Custom Logging Handler ----------------
 class FlushFileHandler(logging.FileHandler):
-    def emit(self, record):
-        super().emit(record)
-        self.flush()
-
-log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
-console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(log_formatter)
-
-file_handler = FlushFileHandler(log_file_path, encoding='utf-8')
-file_handler.setLevel(logging.INFO)
-file_handler.setFormatter(log_formatter)
-
-if app.logger.hasHandlers():
-    app.logger.handlers.clear()
-app.logger.addHandler(console_handler)
-app.logger.addHandler(file_handler)
-app.logger.setLevel(logging.INFO)
-
-app.logger.info("Starting SIEM server")
-app.logger.info(f"Log file path: {log_file_path.resolve()}")
-
-# ---------------- Elasticsearch Setup ----------------
-es = Elasticsearch(
-    ["https://localhost:9200"],                         # HTTPS connection
-    basic_auth=("elastic", "a7AUn2fk5sluS3so8q8f"),     # <-- your tested password
-    verify_certs=False                                  # OK for local dev/self-signed certs
-)
-INDEX_NAME = "siemtrix-logs"
-
-# ---------------- Categories ----------------
-CATEGORIES = {
-    "Entertainment": ["netflix", "youtube", "spotify", "primevideo", "hulu"],
-    "Social Media": ["facebook", "twitter", "instagram", "tiktok", "snapchat"],
-    "News": ["cnn", "bbc", "nytimes", "reuters", "news"],
-    "Work": ["slack", "github", "gitlab", "zoom", "microsoft teams", "jira", "confluence"],
-    "Education": ["khanacademy", "coursera", "edx", "udemy", "academia", "tryhackme"],
-    "Shopping": ["amazon", "ebay", "flipkart", "etsy", "walmart"],
-    "Gaming": ["twitch", "steam", "epicgames", "roblox", "riotgames"],
-    "Finance": ["paypal", "bank", "finance", "trading", "investment"],
-    "Adult": ["porn", "xxx", "sex", "adult", "nsfw"],
-    "Other": []
-}
-
-PRODUCTIVE_CATEGORIES = {"Work", "Education"}
-DISTRACTIVE_CATEGORIES = {"Entertainment", "Social Media", "Shopping", "Gaming", "Adult"}
-NEUTRAL_CATEGORIES = {"News", "Finance", "Other"}
-
-# ---- Threat & Severity rules ----
-SEVERITY_ORDER = ["Low", "Medium", "High", "Critical"]
-
-SEVERITY_KEYWORDS = {
-    "Critical": [
-        "ransomware", "data exfiltration", "rootkit", "domain admin compromise",
-        "privilege escalation success", "encryption in progress",
-        "c2 communication", "command and control", "wiper", "supply chain compromise"
-    ],
-    "High": [
-        "malware detected", "trojan", "botnet", "keylogger", "backdoor",
-        "sql injection", "xss", "remote code execution", "rce", "lateral movement",
-        "brute force success", "multiple failed logins", "payload delivered",
-        "phishing credentials posted", "ddos", "dos attack", "exploitation"
-    ],
-    "Medium": [
-        "failed login", "suspicious", "anomalous", "port scan", "scan detected",
-        "phishing", "blocked", "policy violation", "vpn anomaly", "geo anomaly",
-        "file quarantine", "malicious url"
-    ],
-    "Low": [
-        "warning", "adware", "pua", "unwanted", "spam", "info", "debug",
-        "blocked by policy"
-    ]
-}
-
-THREAT_TYPES = {
-    "ransomware": ["ransomware", "encryption demanded", "files encrypted"],
-    "malware": ["malware", "virus", "payload", "infected", "quarantined"],
-    "trojan": ["trojan", "backdoor", "remote access trojan", "rat"],
-    "worm": ["worm", "self-replicating"],
-    "spyware": ["spyware", "keylogger", "credential theft"],
-    "adware": ["adware", "pua", "unwanted"],
-    "phishing": ["phishing", "credential harvest", "fake login", "spoofed"],
-    "brute-force": ["brute force", "multiple failed login", "password spray"],
-    "sql-injection": ["sql injection", "sqli"],
-    "xss": ["xss", "cross site scripting"],
-    "dos": ["ddos", "dos", "denial of service"],
-    "c2": ["c2", "command and control", "beacon"],
-}
-
-IOC_PATTERNS = [
-    r"(?:\d{1,3}\.){3}\d{1,3}",                  # IP addresses
-    r"[0-9a-f]{32,64}",                          # hashes md5/sha1/sha256 length-ish
-    r"(?:http|https)://[^\s]+",                  # urls
-    r"[a-z0-9\.\-]+\.[a-z]{2,}"                  # domains
-]
-
-def categorize_log(message: str) -> str:
-    m = message.lower()
-    for category, keywords in CATEGORIES.items():
-        if any(k in m for k in keywords):
-            return category
-    return "Other"
-
-def classify_productivity(category: str) -> str:
-    if category in PRODUCTIVE_CATEGORIES:
-        return "Productive"
-    if category in DISTRACTIVE_CATEGORIES:
-        return "Distractive"
-    return "Neutral"
-
-def detect_threat_type(message: str) -> str:
-    m = message.lower()
-    for ttype, keys in THREAT_TYPES.items():
-        if any(k in m for k in keys):
-            return ttype
-    return "none"
-
-def score_severity(log_level: str, message: str, category: str) -> str:
     """
-    Choose the highest matching severity by keyword; escalate
-    on signal like log level ERROR/CRITICAL and obvious IOC presence.
+    Appends each record under the shared log lock and closes the file again,
+    so log_maintenance can compact or rotate server.log while we are running.
     """
-    m = message.lower()
-    chosen = "Low"
-
-    # keyword-based
-    for level in SEVERITY_ORDER[::-1]:  # start from Critical downwards
-        if any(k in m for k in SEVERITY_KEYWORDS[level]):
-            chosen = level
-            break
-
-    # escalate if we see IOCs (IPs, URLs, hashes, domains)
-    if any(re.search(p, m) for p in IOC_PATTERNS):
-        chosen = max(chosen, "Medium", key=lambda s: SEVERITY_ORDER.index(s))
-
-    # log level based hints
-    lvl = (log_level or "").upper()
-    if lvl in ("CRITICAL", "FATAL"):
-        chosen = "Critical"
-    elif lvl == "ERROR":
-        chosen = max(chosen, "High", key=lambda s: SEVERITY_ORDER.index(s))
-    elif lvl == "WARN":
-        chosen = max(chosen, "Medium", key=lambda s: SEVERITY_ORDER.index(s))
-
-    # productivity context: distractive with policy violation can be Medium
-    if category in DISTRACTIVE_CATEGORIES and ("policy" in m or "blocked" in m):
-        chosen = max(chosen, "Medium", key=lambda s: SEVERITY_ORDER.index(s))
-
-    return chosen
+    def __init__(self, filename, encoding=None):
+        super().__init__(filename, encoding=encoding, delay=True)
+
+    def emit(self, record):
+        with log_lock(self.baseFilename):
+            self.stream = self._open()
+            try:
+                logging.StreamHandler.emit(self, record)
+            finally:
+                stream, self.stream = self.stream, None
+                stream.close()
+
+
+def configure_logging(app):
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.INFO)
+    console_handler.setFormatter(log_formatter)
+
+    file_handler = FlushFileHandler(log_file_path, encoding='utf-8')
+    file_handler.setLevel(logging.INFO)
+    file_handler.setFormatter(log_formatter)
+
+    if app.logger.hasHandlers():
+        app.logger.handlers.clear()
+    app.logger.addHandler(console_handler)
+    app.logger.addHandler(file_handler)
+    app.logger.setLevel(logging.INFO)
+
+
+bp = Blueprint("siem", __name__)
+
+
+# ---------------- Application Factory ----------------
+def create_app():
+    app = Flask(__name__)
+    CORS(app, origins=["http://localhost:3000"], supports_credentials=True)
+    app.secret_key = "supersecret"  # Replace with a secure key in production
+
+    configure_logging(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(chrome_logs)
+    # store still-open dwell sessions instead of losing them on restart/shutdown
+    atexit.register(sessionizer.flush)
+
+    app.logger.info("Starting SIEM server")
+    app.logger.info(f"Log file path: {log_file_path.resolve()}")
+    return app
+
+
+def __getattr__(name):
+    # keep `server:app` working for WSGI runners without building the app on import
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def utcnow():
     # ensure timezone-aware ISO for ES
     return datetime.now(timezone.utc)
 
 # ---------------- Routes ----------------
-@app.route("/")
+@bp.route("/")
 def home():
     return "✅ SIEM Server (Elasticsearch-enabled) is running."
 
-@app.route("/log", methods=["POST"])
+@bp.route("/log", methods=["POST"])
 def receive_log():
+    """Ingest one JSON event, or a binary batch (?analysis=1 echoes per-record results)."""
+    if request.mimetype == wire_format.MIMETYPE:
+        if not wire_format.available():
+            return jsonify({"error": "Binary wire format not supported (msgpack missing)"}), 415
+        try:
+            entries = wire_format.decode(request.get_data(cache=False))
+        except wire_format.WireFormatError as e:
+            return jsonify({"error": f"Invalid frame: {e}"}), 400
+        analyses = [ingest_log(data) for data in entries if isinstance(data, dict)]
+        body = {"status": "Logs received", "count": len(analyses)}
+        # per-record analysis would hand back much of what the binary format saves
+        if request.args.get("analysis") in ("1", "true"):
+            body["analysis"] = analyses
+        return jsonify(body), 200
+
     data = request.get_json(silent=True)
     if not data:
         return jsonify({"error": "Invalid JSON"}), 400
 
+    analysis = ingest_log(data)
+    return jsonify({"status": "Log received", "analysis": analysis}), 200
+
+def ingest_log(data):
+    """Classify one agent event, log it locally and index it in Elasticsearch."""
     log_message = data.get("log", "")
     log_level = data.get("level", "INFO")
 
-    category = categorize_log(log_message)
-    productivity = classify_productivity(category)
-    threat_type = detect_threat_type(log_message)
-    severity = score_severity(log_level, log_message, category)
+    # known-bad indicators from local threat-intel feeds escalate severity
+    analysis, iocs = classify_event(log_message, log_level, data.get("url"), get_intel())
+    sketch_window.observe(request.remote_addr, iocs["ips"], iocs["domains"])
+
+    # chrome-url-logger navigation advances the client's browsing session
+    url = navigation_url(data)
+    if url:
+        client = f"{request.remote_addr}|{request.headers.get('User-Agent', '')}"
+        sessionizer.observe(client, url)
 
     log_entry = {
         "level": log_level,
@@ -204,14 +163,11 @@ def receive_log():
         "log": log_message,
         "ip": request.remote_addr,
         "user_agent": request.headers.get("User-Agent", ""),
-        "category": category,
-        "productivity": productivity,       # NEW
-        "threat_type": threat_type,         # NEW
-        "severity": severity                # NEW
+        **analysis
     }
 
     # Local logging
-    app.logger.info(
+    current_app.logger.info(
         f"log: {log_entry['log']}\n"
         f"ip: {log_entry['ip']}\n"
         f"user_agent: {log_entry['user_agent']}\n"
@@ -223,20 +179,15 @@ def receive_log():
 
     # Elasticsearch logging (safe)
     try:
-        es.index(index=INDEX_NAME, document=log_entry)
-        app.logger.info("✅ Log successfully sent to Elasticsearch")
+        get_es().index(index=INDEX_NAME, document=log_entry)
+        current_app.logger.info("✅ Log successfully sent to Elasticsearch")
     except Exception as e:
-        app.logger.error(f"⚠️ Failed to write to Elasticsearch: {e}")
+        current_app.logger.error(f"⚠️ Failed to write to Elasticsearch: {e}")
 
-    return jsonify({"status": "Log received", "analysis": {
-        "category": category,
-        "productivity": productivity,
-        "threat_type": threat_type,
-        "severity": severity
-    }}), 200
+    return analysis
 
 # --------- Stats: summary JSON ----------
-@app.route("/stats/summary")
+@bp.route("/stats/summary")
 def stats_summary():
     """
     Returns counts for Productive/Distractive/Neutral, top categories,
@@ -256,7 +207,7 @@ def stats_summary():
         }
     }
     try:
-        res = es.search(index=INDEX_NAME, body=body)
+        res = get_es().search(index=INDEX_NAME, body=body)
         def buckets_to_dict(b):
             return {x["key"]: x["doc_count"] for x in b["buckets"]}
         out = {
@@ -271,8 +222,54 @@ def stats_summary():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+# --------- Stats: time series JSON ----------
+@bp.route("/stats/timeseries")
+def stats_timeseries():
+    """
+    Returns counts per interval for the last N hours split by productivity,
+    severity or threat_type (?by=). The interval is picked so at most
+    max_points buckets come back; closed buckets are served from cache.
+    """
+    hours = float(request.args.get("hours", 24))
+    series = request.args.get("by", "productivity")
+    max_points = int(request.args.get("max_points", DEFAULT_MAX_POINTS))
+    if series not in SERIES_FIELDS:
+        return jsonify({"error": f"Invalid 'by'. Use one of: {', '.join(SERIES_FIELDS)}"}), 400
+    if not 0 < hours <= MAX_WINDOW_HOURS:
+        return jsonify({"error": f"'hours' must be between 0 and {MAX_WINDOW_HOURS}"}), 400
+    if not 2 <= max_points <= MAX_POINTS_LIMIT:
+        return jsonify({"error": f"'max_points' must be between 2 and {MAX_POINTS_LIMIT}"}), 400
+
+    try:
+        out = timeseries(
+            lambda body: get_es().search(index=INDEX_NAME, body=body),
+            series, hours, max_points, cache=timeseries_cache
+        )
+        return jsonify(out)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# --------- Stats: streaming sketches JSON ----------
+@bp.route("/stats/sketch")
+def stats_sketch():
+    """
+    Approximate distinct counts and top-k over the last N minutes, answered
+    from in-memory sketches maintained at ingest (no Elasticsearch query).
+    Optional point lookups: ?ip=1.2.3.4&domain=example.com (repeatable).
+    """
+    minutes = float(request.args.get("minutes", 60))
+    top = int(request.args.get("top", 20))
+    if minutes <= 0 or top <= 0:
+        return jsonify({"error": "'minutes' and 'top' must be positive"}), 400
+
+    return jsonify(sketch_window.summary(
+        minutes * 60, top=top,
+        count_ips=request.args.getlist("ip"),
+        count_domains=request.args.getlist("domain")
+    ))
+
 # --------- Chart: Productivity Pie (PNG) ----------
-@app.route("/charts/productivity.png")
+@bp.route("/charts/productivity.png")
 def productivity_pie_chart():
     """
     Returns a PNG pie chart of Productive vs Distractive vs Neutral for last N hours.
@@ -289,7 +286,8 @@ def productivity_pie_chart():
     }
 
     try:
-        res = es.search(index=INDEX_NAME, body=body)
+        plt = get_pyplot()
+        res = get_es().search(index=INDEX_NAME, body=body)
         buckets = res["aggregations"]["by_productivity"]["buckets"]
         labels = [b["key"] for b in buckets]
         sizes = [b["doc_count"] for b in buckets]
@@ -315,6 +313,7 @@ def productivity_pie_chart():
 
 # ---------------- Main ----------------
 if __name__ == "__main__":
+    app = create_app()
     print("Log file path:", log_file_path.resolve())
     if not os.access(log_file_path, os.W_OK):
         print("⚠️ Warning: server.log is not writable.")
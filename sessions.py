@@ -0,0 +1,171 @@
+"""
+Browser sessionization at ingest time.
+
+Navigation events from chrome-url-logger ("Tab updated: <url>", plus its
+`url` field) advance a per-client session. Time between consecutive events
+counts toward the domain the client was on, gaps of IDLE_SECONDS or more count
+as idle (the same rule parse_focus_logs applied to server.log), and a
+session is emitted as a dwell record (domain, start, duration) when the
+client moves to another domain or goes idle.
+"""
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+import logging
+import threading
+
+from classifier import categorize_host, classify_productivity
+from es_client import get_es, SESSIONS_INDEX
+
+logger = logging.getLogger(__name__)
+
+NAVIGATION_PREFIX = "Tab updated:"
+IDLE_SECONDS = 600
+SWEEP_SECONDS = 60
+MAX_CLIENTS = 10000
+
+
+def navigation_url(data):
+    """URL of a chrome-url-logger navigation event, or None for other events."""
+    message = data.get("log") or ""
+    if not message.startswith(NAVIGATION_PREFIX):
+        return None
+    return data.get("url") or message[len(NAVIGATION_PREFIX):].strip() or None
+
+
+def url_domain(url):
+    try:
+        return urlsplit(url).netloc
+    except ValueError:
+        return ""
+
+
+class Session:
+    __slots__ = ("domain", "start", "last_seen", "duration")
+
+    def __init__(self, domain, now):
+        self.domain = domain
+        self.start = now
+        self.last_seen = now
+        self.duration = 0.0
+
+    def record(self, client):
+        category = categorize_host(self.domain.split(":")[0])
+        return {
+            "client": client,
+            "domain": self.domain,
+            "start": self.start,
+            "end": self.start + timedelta(seconds=self.duration),
+            "duration_seconds": round(self.duration, 3),
+            "category": category,
+            "productivity": classify_productivity(category),
+        }
+
+
+class Sessionizer:
+    def __init__(self, emit, idle_seconds=IDLE_SECONDS, max_clients=MAX_CLIENTS):
+        self.emit = emit
+        self.idle = timedelta(seconds=idle_seconds)
+        self.max_clients = max_clients
+        self.sessions = {}
+        self._lock = threading.Lock()
+        self._last_sweep = None
+
+    def observe(self, client, url, now=None):
+        """Advance the client's session with a navigation to url."""
+        now = now or datetime.now(timezone.utc)
+        domain = url_domain(url)
+        finished = []
+        with self._lock:
+            current = self.sessions.get(client)
+            if current:
+                gap = now - current.last_seen
+                if timedelta(0) < gap < self.idle:
+                    current.duration += gap.total_seconds()
+                if current.domain != domain or gap >= self.idle:
+                    finished.append(current.record(client))
+                    current = None
+                else:
+                    current.last_seen = now
+            if current is None:
+                if client not in self.sessions and len(self.sessions) >= self.max_clients:
+                    finished.extend(self._evict_oldest())
+                self.sessions[client] = Session(domain, now)
+            finished.extend(self._sweep(now))
+        self._emit(finished)
+
+    def _sweep(self, now):
+        """Close sessions idle past the threshold; runs at most every SWEEP_SECONDS."""
+        if self._last_sweep and (now - self._last_sweep).total_seconds() < SWEEP_SECONDS:
+            return []
+        self._last_sweep = now
+        stale = [c for c, s in self.sessions.items() if now - s.last_seen >= self.idle]
+        return [self.sessions.pop(c).record(c) for c in stale]
+
+    def _evict_oldest(self):
+        client = min(self.sessions, key=lambda c: self.sessions[c].last_seen)
+        return [self.sessions.pop(client).record(client)]
+
+    def _emit(self, records):
+        for record in records:
+            if record["duration_seconds"] <= 0:
+                continue
+            try:
+                self.emit(record)
+            except Exception as e:
+                logger.error(f"⚠️ Failed to store session for {record['domain']}: {e}")
+
+    def flush(self):
+        """Emit every open session, e.g. on shutdown."""
+        with self._lock:
+            records = [s.record(c) for c, s in self.sessions.items()]
+            self.sessions.clear()
+        self._emit(records)
+
+    def clear(self):
+        """Drop every open session without emitting it; returns how many were dropped."""
+        with self._lock:
+            dropped = len(self.sessions)
+            self.sessions.clear()
+        return dropped
+
+    def open_durations(self, since):
+        """{domain: seconds} for sessions still open, counted from `since`."""
+        out = {}
+        with self._lock:
+            for s in self.sessions.values():
+                if s.last_seen >= since and s.duration > 0:
+                    out[s.domain] = out.get(s.domain, 0.0) + s.duration
+        return out
+
+
+def focus_query(hours):
+    """Sum of dwell seconds per domain for sessions that started in the last N hours."""
+    return {
+        "query": {"range": {"start": {"gte": f"now-{hours}h"}}},
+        "size": 0,
+        "aggs": {
+            "by_domain": {
+                "terms": {"field": "domain.keyword", "size": 1000},
+                "aggs": {"seconds": {"sum": {"field": "duration_seconds"}}}
+            }
+        }
+    }
+
+
+def focus_times(res):
+    return {b["key"]: b["seconds"]["value"] for b in res["aggregations"]["by_domain"]["buckets"]}
+
+
+def clear_sessions():
+    """Delete every stored dwell record; returns the number deleted."""
+    res = get_es().delete_by_query(index=SESSIONS_INDEX, body={"query": {"match_all": {}}},
+                                   refresh=True, conflicts="proceed")
+    return res.get("deleted", 0)
+
+
+def store_session(record):
+    get_es().index(index=SESSIONS_INDEX, document=record)
+
+
+# shared by the ingest path (server.py) and the focus endpoints (chrome_logs_api.py)
+sessionizer = Sessionizer(emit=store_session)
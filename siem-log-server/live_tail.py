@@ -0,0 +1,127 @@
+"""
+In-process fan-out of newly ingested events to live-tail subscribers (SSE).
+
+Each subscriber owns a bounded buffer. When a client reads slower than events
+arrive, the oldest buffered events are dropped and the client is told how many
+it missed, so one stalled dashboard never holds memory or blocks ingest.
+"""
+from collections import deque
+from datetime import datetime
+import json
+import threading
+
+BUFFER_SIZE = 256
+HEARTBEAT_SECONDS = 15
+FILTER_FIELDS = ("category", "severity", "level")
+
+
+def parse_filters(args):
+    """Build {field: {values}} from query args like ?category=Work,News&level=ERROR."""
+    filters = {}
+    for field in FILTER_FIELDS:
+        raw = args.get(field)
+        if raw:
+            filters[field] = {v.strip().lower() for v in raw.split(",") if v.strip()}
+    return filters
+
+
+def matches(event, filters):
+    return all(str(event.get(f, "")).lower() in values for f, values in filters.items())
+
+
+class Subscriber:
+    def __init__(self, filters, buffer_size=BUFFER_SIZE):
+        self.filters = filters
+        self.buffer = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self.cond = threading.Condition()
+
+    def push(self, event):
+        with self.cond:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(event)
+            self.cond.notify()
+
+    def drain(self, timeout):
+        """Wait up to timeout for events; returns (events, dropped_since_last_drain)."""
+        with self.cond:
+            if not self.buffer:
+                self.cond.wait(timeout)
+            events = list(self.buffer)
+            self.buffer.clear()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+
+class Broadcaster:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, filters=None, buffer_size=BUFFER_SIZE):
+        sub = Subscriber(filters or {}, buffer_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event):
+        # snapshot so publishing never holds the lock while touching subscribers
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            if matches(event, sub.filters):
+                sub.push(event)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+
+def to_json(event):
+    def default(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return str(value)
+    return json.dumps(event, default=default)
+
+
+def format_sse(event=None, data=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {data}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream(broadcaster, filters, backfill=(), heartbeat=HEARTBEAT_SECONDS):
+    """
+    Generator of SSE frames: first any backfilled events, then live ones.
+    Subscribes before the caller runs the backfill query so nothing is missed
+    in between; events already sent in the backfill are skipped by id.
+    """
+    sub = broadcaster.subscribe(filters)
+    try:
+        seen = set()
+        for event in backfill:
+            seen.add(str(event.get("_id")))
+            yield format_sse(data=to_json(event), event_id=event.get("_id"))
+        while True:
+            events, dropped = sub.drain(heartbeat)
+            if dropped:
+                yield format_sse(event="dropped", data=json.dumps({"dropped": dropped}))
+            if not events and not dropped:
+                yield ": keepalive\n\n"
+            for event in events:
+                event_id = str(event.get("_id"))
+                if event_id in seen:
+                    continue
+                yield format_sse(data=to_json(event), event_id=event_id)
+            seen.clear()
+    finally:
+        broadcaster.unsubscribe(sub)
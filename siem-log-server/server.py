@@ -1,16 +1,26 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from pymongo import MongoClient
+from bson import ObjectId
 from datetime import datetime
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 
+from live_tail import Broadcaster, matches, parse_filters, stream
+
+# shared modules (classifier, log_maintenance, threat_intel) live at the repository root
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+from classifier import classify_event
+from log_maintenance import append_record
+from threat_intel import get_intel
+
 # Load .env variables
 load_dotenv()
 
 # Flask app
-app = Flask(__name__)
+app = Flask(__name__, template_folder=str(Path(__file__).parent))
 CORS(app, origins=["http://localhost:3000"], supports_credentials=True)
 app.secret_key = "supersecret"  # Replace with a secure key in production
 
@@ -19,39 +29,19 @@ MONGO_URI = os.getenv("MONGODB_URI")
 client = MongoClient(MONGO_URI)
 collection = client["logs_database"]["server_logs"]
 
+# Live tail fan-out for /logs/stream subscribers
+broadcaster = Broadcaster()
+BACKFILL_LIMIT = 500
+
 # Ensure logs folder exists
 os.makedirs("siem-log-server/logs", exist_ok=True)
 log_file_path = Path("siem-log-server/logs/server.log")
 
-# Predefined categories and associated keywords
-CATEGORIES = {
-    "Entertainment": ["netflix", "youtube", "spotify", "primevideo", "hulu"],
-    "Social Media": ["facebook", "twitter", "instagram", "tiktok", "snapchat"],
-    "News": ["cnn", "bbc", "nytimes", "reuters", "news"],
-    "Work": ["slack", "github", "gitlab", "zoom", "microsoft teams"],
-    "Education": ["khanacademy", "coursera", "edx", "udemy", "academia"],
-    "Shopping": ["amazon", "ebay", "flipkart", "etsy", "walmart"],
-    "Gaming": ["twitch", "steam", "epicgames", "roblox", "riotgames"],
-    "Finance": ["paypal", "bank", "finance", "trading", "investment"],
-    "Adult": ["porn", "xxx", "sex", "adult", "nsfw"],
-    "Other": []
-}
-
-# Categorize logs based on keywords
-def categorize_log(message: str) -> str:
-    message = message.lower()
-    for category, keywords in CATEGORIES.items():
-        if any(keyword in message for keyword in keywords):
-            return category
-    return "Other"
-
-# Write to local server log
+# Write to local server log (under the same lock as rotation/compaction)
 def write_pretty_log(entry):
     try:
-        with open(log_file_path, "a", encoding="utf-8") as f:
-            for key, value in entry.items():
-                f.write(f"{key}: {value}\n")
-            f.write("\n")
+        block = "".join(f"{key}: {value}\n" for key, value in entry.items()) + "\n"
+        append_record(log_file_path, block)
     except Exception as e:
         print("Failed to write to server.log:", e)
 
@@ -83,11 +73,16 @@ def receive_log():
         "log": log_message,
         "ip": request.remote_addr,
         "user_agent": request.headers.get("User-Agent", ""),
-        "category": categorize_log(log_message)
     }
+    if data.get("url"):
+        log_entry["url"] = data["url"]  # backfill.py re-extracts indicators from it
+    # derived fields from the shared classifier, as the main server and backfill.py store them
+    analysis, _ = classify_event(log_message, log_level, log_entry.get("url"), get_intel())
+    log_entry.update(analysis)
 
     write_pretty_log(log_entry)
     log_to_mongodb(log_entry)
+    broadcaster.publish(log_entry)
     return jsonify({"status": "Log received"}), 200
 
 @app.route("/logs/recent", methods=["GET"])
@@ -97,6 +92,33 @@ def recent_logs():
         log["_id"] = str(log["_id"])
     return jsonify(logs)
 
+@app.route("/logs/stream", methods=["GET"])
+def stream_logs():
+    """
+    Server-Sent Events feed of newly ingested logs.
+    Optional filters: ?category=Work,News&severity=High&level=ERROR
+    Reconnecting clients send Last-Event-ID (or ?last_id=) to backfill the gap from MongoDB.
+    """
+    filters = parse_filters(request.args)
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+
+    def backfill():
+        if not last_id:
+            return
+        try:
+            query = {"_id": {"$gt": ObjectId(last_id)}}
+        except Exception:
+            return
+        for log in collection.find(query).sort("_id", 1).limit(BACKFILL_LIMIT):
+            if matches(log, filters):
+                yield log
+
+    return Response(
+        stream_with_context(stream(broadcaster, filters, backfill())),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route("/logs/view", methods=["GET"])
 def view_logs():
     return render_template("logs.html")
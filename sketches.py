@@ -0,0 +1,308 @@
+"""
+Fixed-memory streaming sketches for ingest-time analytics.
+
+* HyperLogLog      - distinct counts (domains, remote IPs, remote IPs per host)
+* CountMinSketch   - approximate frequency of any single value
+* SpaceSaving      - top-k heavy hitters (talkers, remote IPs, domains)
+
+All three are mergeable, so SketchWindow keeps one set per time bucket in a
+ring and answers "last N minutes" by merging the covered buckets. Memory is
+bounded by the ring length and sketch sizes, not by event or value counts.
+"""
+from array import array
+from hashlib import blake2b
+import math
+import threading
+import time
+
+MASK64 = (1 << 64) - 1
+
+
+def hash64(value, seed=0):
+    digest = blake2b(str(value).encode("utf-8"), digest_size=8,
+                     salt=seed.to_bytes(8, "little")).digest()
+    return int.from_bytes(digest, "little")
+
+
+class HyperLogLog:
+    """HLL with 2**p one-byte registers; standard error is about 1.04 / sqrt(2**p)."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        h = hash64(value)
+        idx = h >> (64 - self.p)
+        rest = (h << self.p) & MASK64
+        rank = 64 - self.p + 1 if rest == 0 else 64 - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def merge(self, other):
+        if other.p != self.p:
+            raise ValueError("cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def copy(self):
+        clone = HyperLogLog(self.p)
+        clone.registers[:] = self.registers
+        return clone
+
+
+class CountMinSketch:
+    """width x depth counters; overestimates by at most ~e/width * N with prob 1 - e**-depth."""
+
+    def __init__(self, width=1024, depth=4):
+        self.width = width
+        self.depth = depth
+        self.table = array("I", bytes(4 * width * depth))
+
+    def _cells(self, value):
+        h = hash64(value)
+        h1, h2 = h & 0xFFFFFFFF, h >> 32
+        return [row * self.width + (h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, value, count=1):
+        for cell in self._cells(value):
+            self.table[cell] = min(self.table[cell] + count, 0xFFFFFFFF)
+
+    def estimate(self, value):
+        return min(self.table[cell] for cell in self._cells(value))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge CountMinSketches of different shape")
+        self.table = array("I", (min(a + b, 0xFFFFFFFF) for a, b in zip(self.table, other.table)))
+        return self
+
+    def copy(self):
+        clone = CountMinSketch(self.width, self.depth)
+        clone.table = array("I", self.table)
+        return clone
+
+
+class SpaceSaving:
+    """Top-k heavy hitters with at most k counters; each count overestimates by at most `error`."""
+
+    def __init__(self, k=64):
+        self.k = k
+        self.counters = {}   # value -> [count, error]
+
+    def add(self, value, count=1):
+        entry = self.counters.get(value)
+        if entry:
+            entry[0] += count
+        elif len(self.counters) < self.k:
+            self.counters[value] = [count, 0]
+        else:
+            victim = min(self.counters, key=lambda v: self.counters[v][0])
+            floor = self.counters.pop(victim)[0]
+            self.counters[value] = [floor + count, floor]
+
+    def _floor(self):
+        """Largest count an unmonitored value could have (0 until the sketch is full)."""
+        if len(self.counters) < self.k:
+            return 0
+        return min(c for c, _ in self.counters.values())
+
+    def merge(self, other):
+        # a value missing from one side may still have up to that side's floor there
+        self_floor, other_floor = self._floor(), other._floor()
+        combined = {v: [c + other_floor, e + other_floor] for v, (c, e) in self.counters.items()}
+        for v, (count, err) in other.counters.items():
+            if v in combined:
+                combined[v][0] += count - other_floor
+                combined[v][1] += err - other_floor
+            else:
+                combined[v] = [count + self_floor, err + self_floor]
+        top = sorted(combined.items(), key=lambda kv: kv[1][0], reverse=True)[:self.k]
+        self.counters = dict(top)
+        return self
+
+    def top(self, n=20):
+        items = sorted(self.counters.items(), key=lambda kv: kv[1][0], reverse=True)[:n]
+        return [{"value": v, "count": c, "error": e} for v, (c, e) in items]
+
+    def copy(self):
+        clone = SpaceSaving(self.k)
+        clone.counters = {v: list(c) for v, c in self.counters.items()}
+        return clone
+
+
+class KeyedHyperLogLog:
+    """One small HLL per key, capped at max_keys; extra keys share an "__other__" HLL."""
+    OTHER = "__other__"
+
+    def __init__(self, p=8, max_keys=32):
+        self.p = p
+        self.max_keys = max_keys
+        self.sketches = {}
+
+    def add(self, key, value):
+        if key not in self.sketches and len(self.sketches) >= self.max_keys:
+            key = self.OTHER
+        sketch = self.sketches.get(key)
+        if sketch is None:
+            sketch = self.sketches[key] = HyperLogLog(self.p)
+        sketch.add(value)
+
+    def merge(self, other):
+        for key, sketch in other.sketches.items():
+            if key in self.sketches:
+                self.sketches[key].merge(sketch)
+            elif len(self.sketches) < self.max_keys:
+                self.sketches[key] = sketch.copy()
+            else:
+                fallback = self.sketches.setdefault(self.OTHER, HyperLogLog(self.p))
+                fallback.merge(sketch)
+        return self
+
+    def counts(self):
+        return {key: sketch.count() for key, sketch in self.sketches.items()}
+
+    def copy(self):
+        clone = KeyedHyperLogLog(self.p, self.max_keys)
+        clone.sketches = {k: s.copy() for k, s in self.sketches.items()}
+        return clone
+
+
+class BucketSketches:
+    """Every sketch kept for one time bucket."""
+
+    def __init__(self, start):
+        self.start = start
+        self.events = 0
+        self.domains = HyperLogLog(12)
+        self.remote_ips = HyperLogLog(12)
+        self.remote_ips_per_host = KeyedHyperLogLog(8, 32)
+        self.talkers = SpaceSaving(64)
+        self.top_remote_ips = SpaceSaving(64)
+        self.top_domains = SpaceSaving(64)
+        self.frequency = CountMinSketch(1024, 4)
+
+    def observe(self, host, remote_ips=(), domains=()):
+        self.events += 1
+        if host:
+            self.talkers.add(host)
+        for ip in remote_ips:
+            self.remote_ips.add(ip)
+            self.top_remote_ips.add(ip)
+            self.frequency.add(f"ip:{ip}")
+            if host:
+                self.remote_ips_per_host.add(host, ip)
+        for domain in domains:
+            self.domains.add(domain)
+            self.top_domains.add(domain)
+            self.frequency.add(f"domain:{domain}")
+
+    def merge(self, other):
+        self.events += other.events
+        for name in ("domains", "remote_ips", "remote_ips_per_host", "talkers",
+                     "top_remote_ips", "top_domains", "frequency"):
+            getattr(self, name).merge(getattr(other, name))
+        return self
+
+    def copy(self):
+        clone = BucketSketches(self.start)
+        clone.events = self.events
+        for name in ("domains", "remote_ips", "remote_ips_per_host", "talkers",
+                     "top_remote_ips", "top_domains", "frequency"):
+            setattr(clone, name, getattr(self, name).copy())
+        return clone
+
+
+class SketchWindow:
+    """
+    Ring of per-bucket sketches covering the last bucket_seconds * buckets seconds.
+
+    Closed buckets never change, so queries merge them outside the ingest
+    lock and keep the last few merged results keyed by the buckets they cover.
+    """
+    CLOSED_CACHE_SIZE = 8
+
+    def __init__(self, bucket_seconds=300, buckets=288):
+        self.bucket_seconds = bucket_seconds
+        self.ring = [None] * buckets
+        self._lock = threading.Lock()
+        self._closed_cache = {}   # (bucket starts) -> merged BucketSketches
+        self._cache_lock = threading.Lock()
+
+    def _bucket(self, now):
+        start = int(now // self.bucket_seconds * self.bucket_seconds)
+        slot = (start // self.bucket_seconds) % len(self.ring)
+        bucket = self.ring[slot]
+        if bucket is None or bucket.start != start:
+            bucket = self.ring[slot] = BucketSketches(start)
+        return bucket
+
+    def observe(self, host, remote_ips=(), domains=(), now=None):
+        with self._lock:
+            self._bucket(now or time.time()).observe(host, remote_ips, domains)
+
+    @property
+    def span_seconds(self):
+        return self.bucket_seconds * len(self.ring)
+
+    def merged(self, seconds, now=None):
+        """Merge every bucket that overlaps the last `seconds` (at most span_seconds)."""
+        now = now or time.time()
+        oldest = now - min(seconds, self.span_seconds)
+        current_start = int(now // self.bucket_seconds * self.bucket_seconds)
+        # only the current bucket is still being written; copy it, reference the rest
+        with self._lock:
+            covered = [b for b in self.ring
+                       if b and b.start + self.bucket_seconds > oldest and b.start <= now]
+            current = [b.copy() for b in covered if b.start >= current_start]
+        closed = sorted((b for b in covered if b.start < current_start), key=lambda b: b.start)
+
+        result = self._merge_closed(closed, int(oldest))
+        for bucket in current:
+            result.merge(bucket)
+        return result
+
+    def _merge_closed(self, closed, start):
+        key = tuple(b.start for b in closed)
+        with self._cache_lock:
+            cached = self._closed_cache.get(key)
+        if cached is None:
+            cached = BucketSketches(start)
+            for bucket in closed:
+                cached.merge(bucket)
+            with self._cache_lock:
+                if len(self._closed_cache) >= self.CLOSED_CACHE_SIZE:
+                    self._closed_cache.pop(next(iter(self._closed_cache)))
+                self._closed_cache[key] = cached
+        return cached.copy()
+
+    def summary(self, seconds, top=20, count_ips=(), count_domains=(), now=None):
+        used = min(seconds, self.span_seconds)
+        merged = self.merged(used, now)
+        out = {
+            "window_minutes": used / 60,
+            "requested_minutes": seconds / 60,
+            "events": merged.events,
+            "distinct_domains": merged.domains.count(),
+            "distinct_remote_ips": merged.remote_ips.count(),
+            "distinct_remote_ips_per_host": merged.remote_ips_per_host.counts(),
+            "top_talkers": merged.talkers.top(top),
+            "top_remote_ips": merged.top_remote_ips.top(top),
+            "top_domains": merged.top_domains.top(top),
+        }
+        if count_ips or count_domains:
+            out["frequency"] = {
+                **{f"ip:{ip}": merged.frequency.estimate(f"ip:{ip}") for ip in count_ips},
+                **{f"domain:{d}": merged.frequency.estimate(f"domain:{d}") for d in count_domains},
+            }
+        return out
@@ -0,0 +1,246 @@
+"""
+Threat-intel matching of extracted indicators against local feed files.
+
+Feeds are plain text files in threat-intel/feeds/ (one indicator per line,
+"#" comments, optional extra columns after a comma). Each line is typed
+automatically:
+
+* IPv4 addresses and CIDRs  -> merged, sorted integer ranges (binary search)
+* md5/sha1/sha256 hashes    -> Bloom filter front + sorted 64-bit fingerprints
+* domains                   -> same, checked for the host and each parent domain
+
+`compile_feeds` writes everything into one flat snapshot file that ThreatIntel
+memory-maps, so a server (re)loads millions of indicators without parsing
+and the OS shares the pages between worker processes.
+
+    python threat_intel.py compile
+    python threat_intel.py check 45.13.1.7 evil.example.com
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from hashlib import blake2b
+from pathlib import Path
+import argparse
+import ipaddress
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+
+INTEL_DIR = Path(os.getenv("THREAT_INTEL_DIR", Path(__file__).parent / "threat-intel"))
+FEED_DIR = INTEL_DIR / "feeds"
+SNAPSHOT_PATH = INTEL_DIR / "indicators.bin"
+
+MAGIC = b"AXTI"
+VERSION = 1
+# magic, version, bloom bits, bloom hashes, fingerprints, ip ranges
+HEADER = struct.Struct("<4sIQIxxxxQQ")
+BLOOM_FALSE_POSITIVE = 0.01
+
+HASH_LINE = re.compile(r"^(?:[0-9a-f]{32}|[0-9a-f]{40}|[0-9a-f]{64})$")
+DOMAIN_LINE = re.compile(r"^(?:[a-z0-9_](?:[a-z0-9_\-]{0,61}[a-z0-9])?\.)+[a-z]{2,63}$")
+
+
+def _digest(kind, value):
+    """128-bit digest: low half is the stored fingerprint, both halves drive the Bloom hashes."""
+    d = blake2b(f"{kind}:{value}".encode("utf-8"), digest_size=16).digest()
+    return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little")
+
+
+def _bloom_positions(h1, h2, m, k):
+    return [(h1 + i * h2) % m for i in range(k)]
+
+
+# ---------------- Compile ----------------
+def parse_feed_line(line):
+    """Return (kind, value) where kind is "ip", "hash" or "domain", or None to skip."""
+    value = line.split("#", 1)[0].split(",", 1)[0].strip().lower()
+    if not value:
+        return None
+    try:
+        net = ipaddress.ip_network(value, strict=False)
+        return ("ip", net) if net.version == 4 else None
+    except ValueError:
+        pass
+    if HASH_LINE.match(value):
+        return "hash", value
+    value = value.rstrip(".")
+    if value.startswith("*."):
+        value = value[2:]
+    if DOMAIN_LINE.match(value):
+        return "domain", value
+    return None
+
+
+def merge_ranges(ranges):
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def compile_feeds(feed_dir=FEED_DIR, out_path=SNAPSHOT_PATH):
+    """Parse every feed file and write a snapshot; returns per-kind indicator counts."""
+    fingerprints = set()
+    digests = []
+    ranges = []
+    counts = {"ip": 0, "hash": 0, "domain": 0, "skipped": 0}
+
+    for feed in sorted(Path(feed_dir).glob("*")):
+        if not feed.is_file():
+            continue
+        with open(feed, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                parsed = parse_feed_line(line)
+                if parsed is None:
+                    if line.strip() and not line.lstrip().startswith("#"):
+                        counts["skipped"] += 1
+                    continue
+                kind, value = parsed
+                counts[kind] += 1
+                if kind == "ip":
+                    ranges.append((int(value.network_address), int(value.broadcast_address)))
+                else:
+                    h1, h2 = _digest(kind, value)
+                    if h1 not in fingerprints:
+                        fingerprints.add(h1)
+                        digests.append((h1, h2))
+
+    n = max(len(digests), 1)
+    bloom_bits = max(64, int(math.ceil(-n * math.log(BLOOM_FALSE_POSITIVE) / math.log(2) ** 2 / 64)) * 64)
+    bloom_k = max(1, round(bloom_bits / n * math.log(2)))
+    bloom = bytearray(bloom_bits // 8)
+    for h1, h2 in digests:
+        for pos in _bloom_positions(h1, h2, bloom_bits, bloom_k):
+            bloom[pos >> 3] |= 1 << (pos & 7)
+
+    merged = merge_ranges(ranges)
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, bloom_bits, bloom_k, len(fingerprints), len(merged)))
+        f.write(bloom)
+        for typecode, values in (("Q", sorted(fingerprints)),
+                                 ("I", [s for s, _ in merged]),
+                                 ("I", [e for _, e in merged])):
+            arr = array(typecode, values)
+            if sys.byteorder == "big":
+                arr.byteswap()  # snapshot is little-endian
+            arr.tofile(f)
+    os.replace(tmp, out_path)
+    return counts
+
+
+# ---------------- Match ----------------
+class ThreatIntel:
+    """Read-only view over a memory-mapped snapshot."""
+
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = Path(path)
+        self.mtime = self.path.stat().st_mtime
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, self.bloom_bits, self.bloom_k, n_fp, n_ranges = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a threat-intel snapshot")
+        pos = HEADER.size
+        self.bloom = view[pos:pos + self.bloom_bits // 8]
+        pos += self.bloom_bits // 8
+        self.fingerprints = view[pos:pos + 8 * n_fp].cast("Q")
+        pos += 8 * n_fp
+        self.range_starts = view[pos:pos + 4 * n_ranges].cast("I")
+        pos += 4 * n_ranges
+        self.range_ends = view[pos:pos + 4 * n_ranges].cast("I")
+
+    def __len__(self):
+        return len(self.fingerprints) + len(self.range_starts)
+
+    def _contains(self, kind, value):
+        h1, h2 = _digest(kind, value)
+        for pos in _bloom_positions(h1, h2, self.bloom_bits, self.bloom_k):
+            if not self.bloom[pos >> 3] & (1 << (pos & 7)):
+                return False
+        i = bisect_left(self.fingerprints, h1)
+        return i < len(self.fingerprints) and self.fingerprints[i] == h1
+
+    def match_ip(self, ip):
+        try:
+            a, b, c, d = (int(x) for x in ip.split("."))
+        except ValueError:
+            return False
+        n = (a << 24) | (b << 16) | (c << 8) | d
+        i = bisect_right(self.range_starts, n) - 1
+        return i >= 0 and n <= self.range_ends[i]
+
+    def match_hash(self, value):
+        return self._contains("hash", value.lower())
+
+    def match_domain(self, host):
+        """True if the host or any parent domain (down to two labels) is listed."""
+        labels = host.lower().rstrip(".").split(".")
+        return any(self._contains("domain", ".".join(labels[i:]))
+                   for i in range(max(len(labels) - 1, 1)))
+
+    def match(self, iocs):
+        """Listed indicators among extract_iocs() output, as {"ips": [...], ...}."""
+        hits = {
+            "ips": [ip for ip in iocs.get("ips", ()) if self.match_ip(ip)],
+            "domains": [d for d in iocs.get("domains", ()) if self.match_domain(d)],
+            "hashes": [h for h in iocs.get("hashes", ()) if self.match_hash(h)],
+        }
+        return {k: v for k, v in hits.items() if v}
+
+
+_intel = None
+_intel_lock = threading.Lock()
+
+
+def get_intel():
+    """Shared matcher, reloaded when the snapshot file changes; None without a snapshot."""
+    global _intel
+    try:
+        mtime = SNAPSHOT_PATH.stat().st_mtime
+    except OSError:
+        return None
+    if _intel is None or _intel.mtime != mtime:
+        with _intel_lock:
+            if _intel is None or _intel.mtime != mtime:
+                _intel = ThreatIntel(SNAPSHOT_PATH)
+    return _intel
+
+
+# ---------------- CLI ----------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Threat-intel feeds")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_compile = sub.add_parser("compile", help="build the snapshot from feed files")
+    p_compile.add_argument("--feeds", default=str(FEED_DIR))
+    p_compile.add_argument("--out", default=str(SNAPSHOT_PATH))
+    p_check = sub.add_parser("check", help="look indicators up in the snapshot")
+    p_check.add_argument("indicators", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "compile":
+        print(compile_feeds(args.feeds, args.out))
+    else:
+        intel = get_intel()
+        if intel is None:
+            raise SystemExit(f"No snapshot at {SNAPSHOT_PATH}; run `compile` first")
+        for value in args.indicators:
+            parsed = parse_feed_line(value)
+            kind = parsed[0] if parsed else "domain"
+            hit = {"ip": intel.match_ip, "hash": intel.match_hash,
+                   "domain": intel.match_domain}[kind](value)
+            print(f"{value}: {'LISTED' if hit else 'not listed'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Helpers for /stats/timeseries: automatic interval selection and a cache of
+settled histogram buckets so each refresh only re-queries the recent ones.
+
+A bucket is cached only once it closed more than SETTLE_SECONDS ago (ES makes
+new documents searchable about a second after indexing, and agents deliver
+late). Cached buckets expire after CACHE_TTL_SECONDS, and tools that rewrite
+past documents (backfill.py, legacy_import.py) call mark_stale() so running
+servers drop their caches on the next request.
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+import math
+import threading
+import time
+
+# (label understood by ES fixed_interval, seconds), smallest first
+INTERVALS = [
+    ("1m", 60), ("5m", 300), ("15m", 900), ("30m", 1800),
+    ("1h", 3600), ("3h", 10800), ("6h", 21600), ("12h", 43200),
+    ("1d", 86400), ("7d", 604800),
+]
+SERIES_FIELDS = {
+    "productivity": "productivity.keyword",
+    "severity": "severity.keyword",
+    "threat_type": "threat_type.keyword",
+}
+DEFAULT_MAX_POINTS = 200
+MAX_POINTS_LIMIT = 2000
+MAX_WINDOW_HOURS = 24 * 365 * 20
+CACHE_MAX_BUCKETS = 50000
+CACHE_TTL_SECONDS = 3600
+SETTLE_SECONDS = 60
+STALE_MARKER = Path(__file__).parent / "siem-log-server" / "logs" / "timeseries.stale"
+
+
+def bucket_count(span_seconds, seconds):
+    """Most buckets a window of span_seconds can touch once aligned to the grid."""
+    return math.ceil(span_seconds / seconds) + 1
+
+
+def pick_interval(span_seconds, max_points=DEFAULT_MAX_POINTS):
+    """
+    Smallest interval that keeps the number of buckets at or below max_points
+    (max_points >= 2); past the ladder, the smallest whole number of weeks.
+    """
+    for label, seconds in INTERVALS:
+        if bucket_count(span_seconds, seconds) <= max_points:
+            return label, seconds
+    week = INTERVALS[-1][1]
+    weeks = math.ceil(span_seconds / (week * (max_points - 1)))
+    return f"{weeks * 7}d", weeks * week
+
+
+def align(ts, seconds):
+    """Floor a unix timestamp to the bucket grid (ES fixed_interval buckets start at the epoch)."""
+    return int(ts // seconds * seconds)
+
+
+def mark_stale(marker=STALE_MARKER):
+    """Tell running servers that past documents changed and cached buckets are stale."""
+    marker = Path(marker)
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.touch()
+
+
+class BucketCache:
+    """LRU of settled buckets keyed by (series, interval seconds, bucket start), with a TTL."""
+
+    def __init__(self, max_buckets=CACHE_MAX_BUCKETS, ttl=CACHE_TTL_SECONDS, marker=STALE_MARKER):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_buckets = max_buckets
+        self.ttl = ttl
+        self.marker = Path(marker) if marker else None
+        self._marker_mtime = self._read_marker()
+
+    def _read_marker(self):
+        try:
+            return self.marker.stat().st_mtime if self.marker else None
+        except OSError:
+            return None
+
+    def check_stale(self):
+        """Drop everything if mark_stale() ran since the last check."""
+        mtime = self._read_marker()
+        if mtime != self._marker_mtime:
+            self._marker_mtime = mtime
+            self.invalidate()
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            counts, stored_at = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return counts
+
+    def put(self, key, counts):
+        with self._lock:
+            self._data[key] = (counts, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_buckets:
+                self._data.popitem(last=False)
+
+
+def cached_prefix(cache, series, seconds, starts, settled_end):
+    """
+    {start: counts} for the leading run of cached buckets; the first bucket
+    missing from it must be queried (unsettled buckets are never cached).
+    """
+    counts = {}
+    for start in starts:
+        hit = cache.get((series, seconds, start)) if start < settled_end else None
+        if hit is None:
+            break
+        counts[start] = hit
+    return counts
+
+
+def build_query(field, label, gte_ms, lte_ms):
+    return {
+        "query": {"range": {"time": {"gte": gte_ms, "lte": lte_ms, "format": "epoch_millis"}}},
+        "size": 0,
+        "aggs": {
+            "over_time": {
+                "date_histogram": {
+                    "field": "time",
+                    "fixed_interval": label,
+                    "min_doc_count": 0,
+                    "extended_bounds": {"min": gte_ms, "max": lte_ms},
+                },
+                "aggs": {"by_key": {"terms": {"field": field, "size": 20}}}
+            }
+        }
+    }
+
+
+def parse_buckets(res):
+    """{bucket start (s): {key: count}} from a date_histogram response."""
+    out = {}
+    for b in res["aggregations"]["over_time"]["buckets"]:
+        out[int(b["key"] // 1000)] = {x["key"]: x["doc_count"] for x in b["by_key"]["buckets"]}
+    return out
+
+
+def timeseries(search, series, hours, max_points=DEFAULT_MAX_POINTS, cache=None, now=None):
+    """
+    Counts per interval for the last `hours`, split by `series`.
+    `search` runs an ES query body and returns the response.
+    """
+    field = SERIES_FIELDS[series]
+    now = now or datetime.now(timezone.utc).timestamp()
+    span = hours * 3600
+    label, seconds = pick_interval(span, max_points)
+
+    first = align(now - span, seconds)
+    open_start = align(now, seconds)
+    starts = list(range(first, open_start + 1, seconds))
+    # buckets starting at or after this closed less than SETTLE_SECONDS ago
+    settled_end = now - SETTLE_SECONDS - seconds
+
+    counts = {}
+    if cache:
+        cache.check_stale()
+        counts = cached_prefix(cache, series, seconds, starts, settled_end)
+    i = len(counts)
+    if i < len(starts):
+        fresh = parse_buckets(search(build_query(field, label, starts[i] * 1000, int(now * 1000))))
+        for start in starts[i:]:
+            counts[start] = fresh.get(start, {})
+            if cache and start < settled_end:
+                cache.put((series, seconds, start), counts[start])
+
+    return {
+        "series": series,
+        "interval": label,
+        "interval_seconds": seconds,
+        "window_hours": hours,
+        "queried_from": datetime.fromtimestamp(starts[i] if i < len(starts) else open_start,
+                                               timezone.utc).isoformat(),
+        "buckets": [
+            {
+                "time": datetime.fromtimestamp(start, timezone.utc).isoformat(),
+                "total": sum(counts[start].values()),
+                "counts": counts[start],
+            }
+            for start in starts
+        ],
+    }
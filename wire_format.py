@@ -0,0 +1,106 @@
+"""
+Compact binary framing for agent -> server events (Content-Type
+application/x-alertix-msgpack).
+
+A body is a sequence of frames, each a 4-byte big-endian length followed by a
+MessagePack payload:
+
+    frame 0    {"v": 1, "keys": ["log", "level", "time", ...]}
+    frame 1..n {0: "Suspicious PowerShell ...", 1: "WARNING", 2: 1720105155480, ...}
+
+Keys are interned once per body in the header frame and records refer to them
+by index, so repeated keys like "user_agent" or "source" cost one byte each.
+Agent "time" strings travel as integer epoch milliseconds.
+
+msgpack is an optional dependency; callers check `available()` first.
+
+The agents import this module from the repository root (see
+local-log-agent/log_sender.py), so there is only one implementation.
+"""
+from datetime import datetime
+import struct
+
+MIMETYPE = "application/x-alertix-msgpack"
+VERSION = 1
+AGENT_TIME_FORMAT = "%Y-%m-%d %H:%M:%S,%f"
+_LENGTH = struct.Struct(">I")
+MAX_FRAME_BYTES = 1024 * 1024
+
+try:
+    import msgpack
+except ImportError:  # optional: JSON stays the default wire format
+    msgpack = None
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def available():
+    return msgpack is not None
+
+
+def _time_to_ms(value):
+    if isinstance(value, str):
+        try:
+            return int(datetime.strptime(value, AGENT_TIME_FORMAT).timestamp() * 1000)
+        except ValueError:
+            return value
+    return value
+
+
+def encode(entries):
+    """Pack a list of event dicts into one framed body."""
+    keys = {}
+    records = []
+    for entry in entries:
+        record = {}
+        for k, v in entry.items():
+            if k not in keys:
+                keys[k] = len(keys)
+            record[keys[k]] = _time_to_ms(v) if k == "time" else v
+        records.append(record)
+
+    out = bytearray()
+    for payload in [{"v": VERSION, "keys": list(keys)}, *records]:
+        packed = msgpack.packb(payload, use_bin_type=True)
+        out += _LENGTH.pack(len(packed))
+        out += packed
+    return bytes(out)
+
+
+def iter_frames(body):
+    view = memoryview(body)
+    pos = 0
+    while pos < len(view):
+        if pos + _LENGTH.size > len(view):
+            raise WireFormatError("truncated frame header")
+        (length,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+        if length > MAX_FRAME_BYTES or pos + length > len(view):
+            raise WireFormatError("truncated or oversized frame")
+        yield view[pos:pos + length]
+        pos += length
+
+
+def decode(body):
+    """Unpack a framed body back into a list of event dicts."""
+    frames = iter_frames(body)
+    try:
+        header = msgpack.unpackb(next(frames), raw=False)
+    except StopIteration:
+        raise WireFormatError("empty body")
+    except Exception as e:
+        raise WireFormatError(f"bad header: {e}")
+    if not isinstance(header, dict) or header.get("v") != VERSION:
+        raise WireFormatError("unsupported wire format version")
+    keys = header.get("keys") or []
+
+    entries = []
+    for frame in frames:
+        try:
+            record = msgpack.unpackb(frame, raw=False, strict_map_key=False)
+            entries.append({keys[i]: v for i, v in record.items()})
+        except Exception as e:
+            raise WireFormatError(f"bad record: {e}")
+    return entries